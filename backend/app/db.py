@@ -1,104 +1,540 @@
 """SQLite database helper."""
 from __future__ import annotations
 
+import base64
+import binascii
+import hashlib
 import json
+import os
+import queue
 import sqlite3
-from datetime import datetime
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Generic, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Fixed-width UTC timestamps sort lexically, so ORDER BY created_at can use an index.
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def utc_timestamp() -> str:
+    return datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+
+
+def normalize_timestamp(value: Optional[str]) -> str:
+    """Rewrite an ISO-8601 string (any precision/offset) into the sortable UTC form."""
+    if not value:
+        return utc_timestamp()
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def store_prompt_blob(cur: sqlite3.Cursor, text: Optional[str]) -> Optional[str]:
+    """Store prompt text once in ``prompt_blobs`` and return its SHA-256 key.
+
+    Bodies of at least ``PROMPT_BLOB_MIN_COMPRESS`` bytes are zlib-compressed
+    when ``PROMPT_BLOB_COMPRESSION=zlib`` and compression actually helps.
+    """
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    digest = hashlib.sha256(raw).hexdigest()
+    if cur.execute("SELECT 1 FROM prompt_blobs WHERE hash=?", (digest,)).fetchone():
+        return digest
+    compression, data = "none", raw
+    if os.getenv("PROMPT_BLOB_COMPRESSION", "zlib") == "zlib" and len(raw) >= int(
+        os.getenv("PROMPT_BLOB_MIN_COMPRESS", "256")
+    ):
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            compression, data = "zlib", packed
+    cur.execute(
+        "INSERT OR IGNORE INTO prompt_blobs (hash, compression, data, size, created_at) VALUES (?, ?, ?, ?, ?)",
+        (digest, compression, data, len(raw), utc_timestamp()),
+    )
+    return digest
+
+
+def decode_prompt_blob(compression: str, data: bytes) -> str:
+    raw = zlib.decompress(data) if compression == "zlib" else bytes(data)
+    return raw.decode("utf-8")
+
+
+def import_legacy_evaluations(cur: sqlite3.Cursor, payloads: Iterable[dict]) -> int:
+    """Insert legacy ``{"result", "request", "timestamp"}`` records with executemany.
+
+    Re-importing an evaluation replaces it together with its guideline rows.
+    Rollups are not touched; callers rebuild them once after a bulk load.
+    """
+    prompt_hashes: dict[Optional[str], Optional[str]] = {}
+    evaluation_rows: list[tuple[Any, ...]] = []
+    guideline_rows: list[tuple[Any, ...]] = []
+    for payload in payloads:
+        result = payload["result"]
+        request = payload.get("request") or {}
+        system_prompt = request.get("system_prompt")
+        if system_prompt not in prompt_hashes:
+            prompt_hashes[system_prompt] = store_prompt_blob(cur, system_prompt)
+        evaluation_rows.append(
+            (
+                result["evaluation_id"],
+                result.get("prompt_version"),
+                result["scores"]["preference_alignment"],
+                result["scores"]["guideline_adherence"],
+                result["scores"]["overall"],
+                result.get("notes"),
+                json.dumps(result.get("metadata")) if result.get("metadata") is not None else None,
+                prompt_hashes[system_prompt],
+                request.get("user_message"),
+                normalize_timestamp(payload.get("timestamp")),
+            )
+        )
+        guideline_rows.extend(
+            (
+                result["evaluation_id"],
+                item["guideline"],
+                1 if item["followed"] else 0,
+                item.get("explanation"),
+                item.get("evidence"),
+            )
+            for item in result.get("guideline_results") or []
+        )
+    if not evaluation_rows:
+        return 0
+    cur.executemany(
+        "DELETE FROM evaluation_guidelines WHERE evaluation_id=?",
+        [(row[0],) for row in evaluation_rows],
+    )
+    cur.executemany(
+        """
+        INSERT OR REPLACE INTO evaluations (
+            id, prompt_version, preference_alignment, guideline_adherence,
+            overall, notes, metadata, system_prompt_hash, user_message, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        evaluation_rows,
+    )
+    if guideline_rows:
+        cur.executemany(
+            """
+            INSERT INTO evaluation_guidelines (
+                evaluation_id, guideline, followed, explanation, evidence
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            guideline_rows,
+        )
+    return len(evaluation_rows)
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Opaque keyset cursor for ``ORDER BY created_at DESC, id DESC`` listings."""
+    raw = json.dumps([created_at, row_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+    return str(created_at), str(row_id)
+
+
+def _normalize_created_at(cur: sqlite3.Cursor, table: str) -> None:
+    rows = cur.execute(f"SELECT rowid, created_at FROM {table}").fetchall()
+    updates = [
+        (normalized, row["rowid"])
+        for row in rows
+        if (normalized := normalize_timestamp(row["created_at"])) != row["created_at"]
+    ]
+    if updates:
+        cur.executemany(f"UPDATE {table} SET created_at=? WHERE rowid=?", updates)
+
+
+def _migration_0001_indexes_and_timestamps(cur: sqlite3.Cursor) -> None:
+    for table in ("prompts", "evaluations", "compliance_analyses", "guideline_extractions"):
+        _normalize_created_at(cur, table)
+    # Guideline rows left behind by deletes made while foreign keys were off.
+    cur.execute("DELETE FROM evaluation_guidelines WHERE evaluation_id NOT IN (SELECT id FROM evaluations)")
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_created_at ON evaluations(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluations_prompt_version ON evaluations(prompt_version)",
+        "CREATE INDEX IF NOT EXISTS idx_evaluation_guidelines_evaluation_id ON evaluation_guidelines(evaluation_id)",
+        "CREATE INDEX IF NOT EXISTS idx_prompts_created_at ON prompts(created_at)",
+    ):
+        cur.execute(statement)
+
+
+def rebuild_evaluation_rollups(cur: sqlite3.Cursor) -> None:
+    """Recompute the analytics rollups from raw evaluation rows."""
+    cur.execute("DELETE FROM evaluation_daily_stats")
+    cur.execute(
+        """
+        INSERT INTO evaluation_daily_stats (
+            prompt_version, day, evaluations, preference_sum, guideline_sum, overall_sum
+        )
+        SELECT COALESCE(prompt_version, ''), substr(created_at, 1, 10), COUNT(*),
+               SUM(preference_alignment), SUM(guideline_adherence), SUM(overall)
+        FROM evaluations
+        GROUP BY 1, 2
+        """
+    )
+    cur.execute("DELETE FROM guideline_stats")
+    cur.execute(
+        """
+        INSERT INTO guideline_stats (guideline, checks, violations, last_violated_at)
+        SELECT g.guideline, COUNT(*), SUM(1 - g.followed),
+               MAX(CASE WHEN g.followed = 0 THEN e.created_at END)
+        FROM evaluation_guidelines AS g
+        JOIN evaluations AS e ON e.id = g.evaluation_id
+        GROUP BY g.guideline
+        """
+    )
+
+
+def _migration_0002_evaluation_rollups(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS evaluation_daily_stats (
+            prompt_version TEXT NOT NULL,
+            day TEXT NOT NULL,
+            evaluations INTEGER NOT NULL DEFAULT 0,
+            preference_sum REAL NOT NULL DEFAULT 0,
+            guideline_sum REAL NOT NULL DEFAULT 0,
+            overall_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (prompt_version, day)
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_evaluation_daily_stats_day ON evaluation_daily_stats(day)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS guideline_stats (
+            guideline TEXT PRIMARY KEY,
+            checks INTEGER NOT NULL DEFAULT 0,
+            violations INTEGER NOT NULL DEFAULT 0,
+            last_violated_at TEXT
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_guideline_stats_violations ON guideline_stats(violations DESC)")
+    rebuild_evaluation_rollups(cur)
+
+
+def _migration_0003_keyset_indexes(cur: sqlite3.Cursor) -> None:
+    # (created_at, id) matches the keyset ORDER BY so pages are read straight off the index.
+    for table in ("evaluations", "prompts"):
+        cur.execute(f"DROP INDEX IF EXISTS idx_{table}_created_at")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at_id ON {table}(created_at, id)")
+
+
+def _migration_0004_prompt_blobs(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS prompt_blobs (
+            hash TEXT PRIMARY KEY,
+            compression TEXT NOT NULL DEFAULT 'none',
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    # evaluations keep the (now NULL) system_prompt column; prompts is rebuilt because content was NOT NULL.
+    cur.execute("ALTER TABLE evaluations ADD COLUMN system_prompt_hash TEXT")
+    distinct = [row[0] for row in cur.execute(
+        "SELECT DISTINCT system_prompt FROM evaluations WHERE system_prompt IS NOT NULL"
+    ).fetchall()]
+    for text in distinct:
+        cur.execute(
+            "UPDATE evaluations SET system_prompt_hash=?, system_prompt=NULL WHERE system_prompt=?",
+            (store_prompt_blob(cur, text), text),
+        )
+    cur.execute(
+        """
+        CREATE TABLE prompts_v2 (
+            id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            score REAL,
+            notes TEXT
+        )
+        """
+    )
+    rows = cur.execute("SELECT id, content, created_at, score, notes FROM prompts").fetchall()
+    cur.executemany(
+        "INSERT INTO prompts_v2 (id, content_hash, created_at, score, notes) VALUES (?, ?, ?, ?, ?)",
+        [
+            (row["id"], store_prompt_blob(cur, row["content"]), row["created_at"], row["score"], row["notes"])
+            for row in rows
+        ],
+    )
+    cur.execute("DROP TABLE prompts")
+    cur.execute("ALTER TABLE prompts_v2 RENAME TO prompts")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_prompts_created_at_id ON prompts(created_at, id)")
+    if distinct or rows:
+        print(
+            f"[Database] 프롬프트 본문 {len(distinct)}종(평가) + {len(rows)}개(버전)를 prompt_blobs로 이전했습니다. "
+            "디스크 공간을 회수하려면 VACUUM을 실행하세요."
+        )
+
+
+def _migration_0005_import_checkpoints(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            source TEXT PRIMARY KEY,
+            byte_offset INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            completed INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+
+
+# Applied in order; PRAGMA user_version records how many have run. Append only.
+MIGRATIONS: List[Callable[[sqlite3.Cursor], None]] = [
+    _migration_0001_indexes_and_timestamps,
+    _migration_0002_evaluation_rollups,
+    _migration_0003_keyset_indexes,
+    _migration_0004_prompt_blobs,
+    _migration_0005_import_checkpoints,
+]
 
 
 class Database:
-    """Lightweight SQLite wrapper with automatic schema + legacy import."""
+    """Lightweight SQLite wrapper with automatic schema + legacy import.
+
+    Schema migrations and the legacy import run on first use (or an explicit
+    :meth:`initialize`), not at construction, so importing this module is
+    cheap. Calls borrow a connection from a small pool (WAL journal, tuned
+    ``synchronous``), so routes offloaded to a threadpool never share one.
+    Connections run in autocommit mode; use :meth:`transaction` to group
+    statements under a single commit.
+    """
 
     def __init__(self, db_path: Path | str = Path("./data/app.db")) -> None:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self._ensure_schema()
-        self._bootstrap_from_files()
+        self.synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.busy_timeout = float(os.getenv("SQLITE_BUSY_TIMEOUT", "10"))
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(
+            maxsize=int(os.getenv("SQLITE_POOL_SIZE", "8"))
+        )
+        self._local = threading.local()
+        self._init_lock = threading.RLock()
+        self._initializing = False
+        self.ready = False
 
-    def _ensure_schema(self) -> None:
-        cur = self.conn.cursor()
-        cur.executescript(
-            """
-            CREATE TABLE IF NOT EXISTS prompts (
-                id TEXT PRIMARY KEY,
-                content TEXT NOT NULL,
-                created_at TEXT NOT NULL,
-                score REAL,
-                notes TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS prompt_meta (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS evaluations (
-                id TEXT PRIMARY KEY,
-                prompt_version TEXT,
-                preference_alignment REAL,
-                guideline_adherence REAL,
-                overall REAL,
-                notes TEXT,
-                metadata TEXT,
-                system_prompt TEXT,
-                user_message TEXT,
-                created_at TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS evaluation_guidelines (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                evaluation_id TEXT NOT NULL,
-                guideline TEXT NOT NULL,
-                followed INTEGER NOT NULL,
-                explanation TEXT,
-                evidence TEXT,
-                FOREIGN KEY (evaluation_id) REFERENCES evaluations(id) ON DELETE CASCADE
-            );
-            """
+    def initialize(self) -> None:
+        """Create/migrate the schema and import legacy files once; safe to call from any thread."""
+        if self.ready:
+            return
+        with self._init_lock:
+            # Re-entered from the schema setup's own connection() calls on this thread.
+            if self.ready or self._initializing:
+                return
+            self._initializing = True
+            try:
+                self._ensure_schema()
+                self._bootstrap_from_files()
+                self.ready = True
+            finally:
+                self._initializing = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
         )
-        self.conn.commit()
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        # Off by default in SQLite; needed for ON DELETE CASCADE on evaluation_guidelines.
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection; inside a transaction the thread keeps using its own."""
+        if not self.ready:
+            self.initialize()
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close_all(self) -> None:
+        """Close idle pooled connections (borrowed ones are closed when returned to a full pool)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _ensure_schema(self) -> None:
+        with self.connection() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS prompts (
+                    id TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    score REAL,
+                    notes TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS prompt_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+
+                CREATE TABLE IF NOT EXISTS evaluations (
+                    id TEXT PRIMARY KEY,
+                    prompt_version TEXT,
+                    preference_alignment REAL,
+                    guideline_adherence REAL,
+                    overall REAL,
+                    notes TEXT,
+                    metadata TEXT,
+                    system_prompt TEXT,
+                    user_message TEXT,
+                    created_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS evaluation_guidelines (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    evaluation_id TEXT NOT NULL,
+                    guideline TEXT NOT NULL,
+                    followed INTEGER NOT NULL,
+                    explanation TEXT,
+                    evidence TEXT,
+                    FOREIGN KEY (evaluation_id) REFERENCES evaluations(id) ON DELETE CASCADE
+                );
+
+                CREATE TABLE IF NOT EXISTS compliance_analyses (
+                    compliance_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'done',
+                    overall_score REAL NOT NULL DEFAULT 0,
+                    summary TEXT,
+                    guideline_results TEXT NOT NULL DEFAULT '[]',
+                    error TEXT,
+                    created_at TEXT NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS guideline_extractions (
+                    prompt_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    guidelines TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (prompt_hash, model)
+                );
+
+                CREATE TABLE IF NOT EXISTS judgment_cache (
+                    key TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+
+                CREATE INDEX IF NOT EXISTS idx_judgment_cache_created_at ON judgment_cache(created_at);
+                """
+            )
+        self._migrate()
+
+    def _migrate(self) -> None:
+        for version, migration in enumerate(MIGRATIONS, start=1):
+            with self.transaction() as cur:
+                # Re-checked under the write lock so concurrent workers apply each step once.
+                if cur.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                migration(cur)
+                cur.execute(f"PRAGMA user_version = {version}")
+            print(f"[Database] 스키마 마이그레이션 {version}: {migration.__name__} 적용")
 
     def query(self, sql: str, params: Iterable[Any] | None = None) -> list[sqlite3.Row]:
-        cur = self.conn.cursor()
-        cur.execute(sql, params or [])
-        return cur.fetchall()
+        with self.connection() as conn:
+            return conn.execute(sql, params or []).fetchall()
 
     def execute(self, sql: str, params: Iterable[Any] | None = None) -> None:
-        cur = self.conn.cursor()
-        cur.execute(sql, params or [])
-        self.conn.commit()
+        with self.connection() as conn:
+            conn.execute(sql, params or [])
 
     def executemany(self, sql: str, params_seq: Iterable[Iterable[Any]]) -> None:
-        cur = self.conn.cursor()
-        cur.executemany(sql, params_seq)
-        self.conn.commit()
+        with self.transaction() as cur:
+            cur.executemany(sql, params_seq)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Run several statements under a single commit (rolled back on error).
+
+        The write lock is taken up front (``BEGIN IMMEDIATE``) so concurrent
+        writers wait on the busy timeout instead of failing mid-transaction.
+        Nested calls join the outer transaction.
+        """
+        with self.connection() as conn:
+            cur = conn.cursor()
+            if conn.in_transaction:
+                yield cur
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
 
     def _bootstrap_from_files(self) -> None:
         prompts_empty = not self.query("SELECT 1 FROM prompts LIMIT 1")
         system_path = Path("./data/system_prompts")
         if prompts_empty and system_path.exists():
             versions = sorted(system_path.glob("version_*.json"))
-            records: list[tuple[Any, ...]] = []
-            for file in versions:
-                data = json.loads(file.read_text())
-                records.append(
-                    (
-                        data["id"],
-                        data["content"],
-                        data.get("created_at"),
-                        data.get("score"),
-                        data.get("notes"),
+            with self.transaction() as cur:
+                records: list[tuple[Any, ...]] = []
+                for file in versions:
+                    data = json.loads(file.read_text())
+                    records.append(
+                        (
+                            data["id"],
+                            store_prompt_blob(cur, data["content"]),
+                            normalize_timestamp(data.get("created_at")),
+                            data.get("score"),
+                            data.get("notes"),
+                        )
                     )
-                )
-            if records:
-                self.executemany(
-                    "INSERT OR IGNORE INTO prompts (id, content, created_at, score, notes) VALUES (?, ?, ?, ?, ?)",
+                cur.executemany(
+                    "INSERT OR IGNORE INTO prompts (id, content_hash, created_at, score, notes) VALUES (?, ?, ?, ?, ?)",
                     records,
                 )
+            if records:
                 current_file = system_path / "current.json"
                 current_id = "version_0001"
                 if current_file.exists():
@@ -111,54 +547,130 @@ class Database:
         evaluations_empty = not self.query("SELECT 1 FROM evaluations LIMIT 1")
         eval_file = Path("./data/evaluations.jsonl")
         if evaluations_empty and eval_file.exists():
-            with eval_file.open("r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    payload = json.loads(line)
-                    result = payload["result"]
-                    request = payload["request"]
-                    self.execute(
-                        """
-                        INSERT OR REPLACE INTO evaluations (
-                            id, prompt_version, preference_alignment, guideline_adherence,
-                            overall, notes, metadata, system_prompt, user_message, created_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (
-                            result["evaluation_id"],
-                            result.get("prompt_version"),
-                            result["scores"]["preference_alignment"],
-                            result["scores"]["guideline_adherence"],
-                            result["scores"]["overall"],
-                            result.get("notes"),
-                            json.dumps(result.get("metadata")) if result.get("metadata") is not None else None,
-                            request.get("system_prompt"),
-                            request.get("user_message"),
-                            payload.get("timestamp", datetime.utcnow().isoformat()),
-                        ),
-                    )
-                    guidelines = result.get("guideline_results") or []
-                    params = [
-                        (
-                            result["evaluation_id"],
-                            item["guideline"],
-                            1 if item["followed"] else 0,
-                            item.get("explanation"),
-                            item.get("evidence"),
-                        )
-                        for item in guidelines
-                    ]
-                    if params:
-                        self.executemany(
-                            """
-                            INSERT INTO evaluation_guidelines (
-                                evaluation_id, guideline, followed, explanation, evidence
-                            ) VALUES (?, ?, ?, ?, ?)
-                            """,
-                            params,
-                        )
+            # 레거시 파일 전체를 한 번의 커밋으로, 청크 단위 executemany로 가져온다.
+            with self.transaction() as cur:
+                with eval_file.open("r", encoding="utf-8") as f:
+                    chunk: list[dict] = []
+                    for line in f:
+                        if line.strip():
+                            chunk.append(json.loads(line))
+                        if len(chunk) >= 1000:
+                            import_legacy_evaluations(cur, chunk)
+                            chunk = []
+                    import_legacy_evaluations(cur, chunk)
+                rebuild_evaluation_rollups(cur)
+
+
+class BatchWriter(Generic[T]):
+    """Background thread that hands queued items to ``handler`` in batches.
+
+    Items are collected until ``max_batch`` is reached or ``max_delay`` seconds
+    pass since the first one, so bursts of writes share one commit.
+
+    A failing batch is retried ``retries`` times with backoff, then written
+    item by item so one bad row cannot sink the rest. Items that still fail
+    are appended as JSON lines (via ``serialize``) to ``dead_letter_path`` so
+    they can be replayed later.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], None],
+        max_batch: Optional[int] = None,
+        max_delay: Optional[float] = None,
+        name: str = "db-writer",
+        retries: Optional[int] = None,
+        serialize: Optional[Callable[[T], Any]] = None,
+        dead_letter_path: Optional[Path | str] = None,
+    ) -> None:
+        self.handler = handler
+        self.max_batch = max_batch or int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("DB_WRITE_BATCH_DELAY", "0.05"))
+        self.name = name
+        self.retries = retries if retries is not None else int(os.getenv("DB_WRITE_RETRIES", "3"))
+        self.serialize = serialize or repr
+        self.dead_letter_path = Path(dead_letter_path or f"./data/{name}.failed.jsonl")
+        self._queue: "queue.Queue[T]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, item: T) -> None:
+        self._ensure_started()
+        self._queue.put(item)
+
+    def flush(self) -> None:
+        """Block until every submitted item has been handled."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[T]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                self.handler(batch)
+                return
+            except Exception as exc:  # pylint: disable=broad-except
+                print(f"[{self.name}] 배치 저장 실패 ({len(batch)}건, 시도 {attempt + 1}/{self.retries + 1}): {exc!r}")
+                if attempt < self.retries:
+                    time.sleep(min(0.1 * 2 ** attempt, 2.0))
+        if len(batch) > 1:
+            print(f"[{self.name}] 항목별 저장으로 재시도 ({len(batch)}건)")
+        failed = []
+        for item in batch:
+            try:
+                self.handler([item])
+            except Exception as exc:  # pylint: disable=broad-except
+                failed.append((item, exc))
+        if failed:
+            self._dead_letter(failed)
 
+    def _dead_letter(self, failed: List[tuple]) -> None:
+        lines = []
+        for item, exc in failed:
+            try:
+                payload = self.serialize(item)
+            except Exception as serialize_exc:  # pylint: disable=broad-except
+                payload = f"<unserializable: {serialize_exc!r}> {item!r}"
+            lines.append(json.dumps(
+                {"failed_at": utc_timestamp(), "error": repr(exc), "item": payload},
+                ensure_ascii=False,
+                default=str,
+            ))
+        try:
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.dead_letter_path.open("a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            print(f"[{self.name}] 저장 실패 {len(failed)}건을 {self.dead_letter_path}에 기록")
+        except OSError as exc:
+            # Last resort: the log itself must carry enough to recover the items.
+            print(f"[{self.name}] 실패 기록 파일 쓰기 실패 ({exc!r}), 항목을 로그로 출력")
+            for line in lines:
+                print(f"[{self.name}] FAILED {line}")
 
 db = Database()
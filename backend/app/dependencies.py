@@ -1,15 +1,159 @@
-"""Shared dependencies and singleton instances for the application."""
-from app.services.rag_service import RAGService
+"""Shared service instances, built lazily on first use.
+
+Routes receive services through ``Depends(get_...)``. Each getter constructs
+its service once per process, the first time it is needed (or during the
+startup warmup, see :func:`warm_up`), and records how long that took so
+cold-start regressions show up in ``/ready`` and the startup log.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from app.db import db
 from app.services.compliance_checker import ComplianceChecker
-from app.services.prompt_store import PromptStore
+from app.services.compliance_jobs import ComplianceJobRunner
 from app.services.evaluation_service import EvaluationService
-from app.services.prompt_improver import PromptImproverService
-
-rag_service = RAGService()
-compliance_checker = ComplianceChecker()
-prompt_store = PromptStore()
-evaluation_service = EvaluationService(
-    compliance_checker=compliance_checker,
-)
-prompt_improver = PromptImproverService(store=prompt_store, evaluation_service=evaluation_service)
-evaluation_service.prompt_improver = prompt_improver
+from app.services.prompt_improver import EVALUATION_WINDOW, PromptImproverService
+from app.services.prompt_store import PromptStore
+from app.services.rag_service import RAGService
+from app.services.upload_jobs import UploadJobRunner
+
+T = TypeVar("T")
+
+# name -> {"status": "pending" | "building" | "ready" | "failed", "seconds": float, "error": str}
+_build_report: Dict[str, Dict[str, Any]] = {}
+_report_lock = threading.Lock()
+
+
+def _lazy(name: str) -> Callable[[Callable[[], T]], Callable[[], T]]:
+    """Turn a factory into a thread-safe getter that builds the instance once."""
+
+    def decorator(factory: Callable[[], T]) -> Callable[[], T]:
+        lock = threading.Lock()
+        holder: List[T] = []
+        _build_report[name] = {"status": "pending", "seconds": None, "error": None}
+
+        @functools.wraps(factory)
+        def getter() -> T:
+            if holder:
+                return holder[0]
+            # One lock per service: building a slow one never blocks the others.
+            with lock:
+                if holder:
+                    return holder[0]
+                with _report_lock:
+                    _build_report[name].update(status="building", error=None)
+                started = time.perf_counter()
+                try:
+                    instance = factory()
+                except Exception as exc:
+                    with _report_lock:
+                        _build_report[name].update(status="failed", error=str(exc))
+                    raise
+                elapsed = time.perf_counter() - started
+                holder.append(instance)
+                with _report_lock:
+                    _build_report[name].update(status="ready", seconds=round(elapsed, 3))
+                print(f"[Startup] {name} 생성 {elapsed:.2f}s")
+                return instance
+
+        getter.is_built = lambda: bool(holder)  # type: ignore[attr-defined]
+        return getter
+
+    return decorator
+
+
+@_lazy("database")
+def get_database():
+    db.initialize()
+    return db
+
+
+@_lazy("rag_service")
+def get_rag_service() -> RAGService:
+    return RAGService()
+
+
+@_lazy("upload_jobs")
+def get_upload_jobs() -> UploadJobRunner:
+    return UploadJobRunner(get_rag_service())
+
+
+@_lazy("compliance_checker")
+def get_compliance_checker() -> ComplianceChecker:
+    get_database()
+    return ComplianceChecker()
+
+
+@_lazy("compliance_jobs")
+def get_compliance_jobs() -> ComplianceJobRunner:
+    return ComplianceJobRunner(get_compliance_checker())
+
+
+@_lazy("prompt_store")
+def get_prompt_store() -> PromptStore:
+    get_database()
+    return PromptStore()
+
+
+def _embed_with_rag(texts: List[str]):
+    # Only embedding-based preference scoring needs the model; defer loading it until then.
+    return get_rag_service().embedding_function(texts)
+
+
+@_lazy("evaluation_service")
+def get_evaluation_service() -> EvaluationService:
+    evaluation_service = EvaluationService(
+        compliance_checker=get_compliance_checker(),
+        embedding_function=_embed_with_rag,
+    )
+    prompt_improver = PromptImproverService(store=get_prompt_store(), evaluation_service=evaluation_service)
+    evaluation_service.prompt_improver = prompt_improver
+    # 이후에는 저장되는 평가가 창을 갱신하므로 DB 조회는 생성 시 한 번뿐이다.
+    prompt_improver.record_evaluations(reversed(evaluation_service.recent_evaluations(limit=EVALUATION_WINDOW)))
+    return evaluation_service
+
+
+def get_prompt_improver() -> PromptImproverService:
+    return get_evaluation_service().prompt_improver
+
+
+# Warmup order: cheap SQLite-backed services first, the embedding model last.
+SERVICE_GETTERS: Dict[str, Callable[[], Any]] = {
+    "database": get_database,
+    "compliance_checker": get_compliance_checker,
+    "compliance_jobs": get_compliance_jobs,
+    "prompt_store": get_prompt_store,
+    "evaluation_service": get_evaluation_service,
+    "rag_service": get_rag_service,
+    "upload_jobs": get_upload_jobs,
+}
+
+
+def warm_up(names: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+    """Build the named services (all by default); returns ``{name: error or None}``.
+
+    A failing service is reported and skipped so the rest still warm up; the
+    next request for it retries the build.
+    """
+    errors: Dict[str, Optional[str]] = {}
+    for name in names or SERVICE_GETTERS:
+        try:
+            SERVICE_GETTERS[name]()
+            errors[name] = None
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[Startup] {name} 생성 실패: {exc}")
+            errors[name] = str(exc)
+    return errors
+
+
+def is_built(name: str) -> bool:
+    return SERVICE_GETTERS[name].is_built()  # type: ignore[attr-defined]
+
+
+def build_report() -> Dict[str, Dict[str, Any]]:
+    with _report_lock:
+        return {name: dict(entry) for name, entry in _build_report.items()}
@@ -1,14 +1,98 @@
+import time
+_import_started = time.perf_counter()
+
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from app.db import db
+from app.dependencies import (
+    SERVICE_GETTERS,
+    build_report,
+    get_compliance_jobs,
+    get_evaluation_service,
+    is_built,
+    warm_up,
+)
 from app.routes import chat, compliance, evaluation, prompt
+from app.services.llm_provider import provider_registry
+
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+# 서비스 워밍업 상태 (/ready 응답과 시작 로그에 사용)
+startup_state = {
+    "mode": None,
+    "started_at": None,
+    "ready": False,
+    "warmup_seconds": None,
+    "errors": {},
+}
+
+
+async def _warm_up(names) -> None:
+    started = time.perf_counter()
+    errors = await asyncio.to_thread(warm_up, names)
+    startup_state["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    startup_state["errors"] = {name: error for name, error in errors.items() if error}
+    startup_state["ready"] = not startup_state["errors"]
+    print(
+        f"[Startup] 워밍업 완료 {startup_state['warmup_seconds']:.2f}s "
+        f"(import {IMPORT_SECONDS:.2f}s, 실패 {len(startup_state['errors'])}건)"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # SERVICE_WARMUP: background(기본, 요청을 받으면서 서비스 생성) | blocking(생성 후 요청 수신) | off(첫 사용 시 생성)
+    mode = os.getenv("SERVICE_WARMUP", "background").lower()
+    names = [name.strip() for name in os.getenv("SERVICE_WARMUP_SERVICES", "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in SERVICE_GETTERS]
+    if unknown:
+        print(f"[Startup] 알 수 없는 워밍업 대상 무시: {', '.join(unknown)}")
+        names = [name for name in names if name in SERVICE_GETTERS]
+
+    # 워커 스레드에서 만료된 async LLM 클라이언트를 메인 루프에서 닫도록 등록
+    provider_registry.bind_loop(asyncio.get_running_loop())
+    startup_state["mode"] = mode
+    startup_state["started_at"] = time.time()
+    print(f"[Startup] app.main import {IMPORT_SECONDS:.2f}s, 워밍업 모드: {mode}")
+
+    warmup_task = None
+    if mode == "blocking":
+        await _warm_up(names or None)
+    elif mode == "off":
+        startup_state["ready"] = True
+    else:
+        warmup_task = asyncio.create_task(_warm_up(names or None))
+
+    yield
+
+    if warmup_task is not None and not warmup_task.done():
+        # 생성 중인 스레드는 취소할 수 없으므로 끝날 때까지 기다린다.
+        await asyncio.shield(warmup_task)
+    # 진행 중인 준수도 분석을 마무리하고, 시간 내 끝나지 않으면 failed로 기록
+    if is_built("compliance_jobs"):
+        await get_compliance_jobs().shutdown()
+    # 큐에 남은 평가를 기록한 뒤 스레드별 연결을 닫는다.
+    if is_built("evaluation_service"):
+        get_evaluation_service().flush_writes()
+    db.close_all()
+    # LLM 프로바이더의 HTTP 커넥션 풀 정리
+    await provider_registry.aclose_all()
+    provider_registry.bind_loop(None)
+
 
 app = FastAPI(
     title="Prompt Compliance RAG API",
     description="시스템 프롬프트 준수도를 분석하는 RAG 챗봇 API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS 설정
@@ -38,3 +122,22 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """워밍업 완료 여부 (/health는 프로세스 생존만 확인)
+
+    준비 전이거나 워밍업 중 실패한 서비스가 있으면 503을 반환한다.
+    import/서비스별 생성 시간을 함께 반환해 콜드 스타트 회귀를 추적할 수 있다.
+    """
+    body = {
+        "ready": startup_state["ready"],
+        "mode": startup_state["mode"],
+        "import_seconds": round(IMPORT_SECONDS, 3),
+        "warmup_seconds": startup_state["warmup_seconds"],
+        "uptime_seconds": round(time.time() - startup_state["started_at"], 3) if startup_state["started_at"] else None,
+        "errors": startup_state["errors"],
+        "services": build_report(),
+    }
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
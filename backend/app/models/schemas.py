@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 
 
@@ -21,6 +21,7 @@ class ChatRequest(BaseModel):
     conversation_history: Optional[List[ChatMessage]] = []
     llm_provider: Optional[str] = None  # ollama, openai, upstage, anthropic, gemini
     model_name: Optional[str] = None  # 특정 모델 이름 (선택사항)
+    bypass_cache: bool = False  # True면 캐시된 준수도 판정을 무시하고 새로 판정
 
 
 class ChatResponse(BaseModel):
@@ -28,6 +29,7 @@ class ChatResponse(BaseModel):
     response: str
     context_used: List[str]  # RAG에서 사용된 컨텍스트
     compliance_id: str  # 준수도 분석 ID
+    compliance_status: str = "pending"  # 준수도 분석 상태 (pending, done, failed)
 
 
 class GuidelineCompliance(BaseModel):
@@ -44,6 +46,8 @@ class ComplianceAnalysis(BaseModel):
     overall_score: float  # 0-100 점수
     guideline_results: List[GuidelineCompliance]
     summary: str
+    status: str = "done"  # pending, done, failed
+    error: Optional[str] = None
 
 
 class DocumentUpload(BaseModel):
@@ -52,6 +56,23 @@ class DocumentUpload(BaseModel):
     metadata: Optional[Dict[str, str]] = None
 
 
+class RetrievalRequest(BaseModel):
+    """여러 쿼리의 RAG 컨텍스트 일괄 검색 요청"""
+    queries: List[str]
+    n_results: int = Field(3, ge=1, le=50)  # 쿼리당 반환할 문서 수
+
+
+class RetrievalResult(BaseModel):
+    """쿼리별 검색 결과"""
+    query: str
+    context: List[str]
+
+
+class RetrievalResponse(BaseModel):
+    """일괄 검색 결과 (요청한 쿼리 순서)"""
+    results: List[RetrievalResult]
+
+
 class EvaluationRequest(BaseModel):
     """시스템 프롬프트 평가 요청"""
     system_prompt: str
@@ -62,6 +83,7 @@ class EvaluationRequest(BaseModel):
     llm_provider: Optional[str] = None
     model_name: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    bypass_cache: bool = False
 
 
 class MatchedReference(BaseModel):
@@ -91,6 +113,37 @@ class EvaluationResult(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class EvaluationPage(BaseModel):
+    """평가 결과 페이지 (최신순)"""
+    items: List[EvaluationResult]
+    next_cursor: Optional[str] = None
+
+
+class EvaluationStatsPoint(BaseModel):
+    """프롬프트 버전 × 일자별 평균 점수"""
+    prompt_version: Optional[str]
+    day: str
+    evaluations: int
+    preference_alignment: float
+    guideline_adherence: float
+    overall: float
+
+
+class GuidelineViolationStat(BaseModel):
+    """가이드라인별 누적 위반 통계"""
+    guideline: str
+    checks: int
+    violations: int
+    violation_rate: float
+    last_violated_at: Optional[str] = None
+
+
+class EvaluationStatsResponse(BaseModel):
+    """평가 집계 통계"""
+    timeseries: List[EvaluationStatsPoint]
+    top_violated_guidelines: List[GuidelineViolationStat]
+
+
 class PromptVersion(BaseModel):
     """프롬프트 버전 정보"""
     id: str
@@ -106,12 +159,16 @@ class PromptImproveRequest(BaseModel):
     evaluation_ids: Optional[List[str]] = None
     target_score: Optional[float] = None
     run_reevaluation: bool = False
+    reevaluation_concurrency: Optional[int] = Field(None, ge=1)  # 동시에 평가할 시나리오 수
+    reevaluation_time_budget: Optional[float] = Field(None, gt=0)  # 재평가 전체 제한 시간(초)
 
 
 class ReEvaluationResult(BaseModel):
     """자동 재평가 요약"""
     evaluations: List[EvaluationResult]
     summary: Optional[str] = None
+    incomplete: List[str] = []  # 제한 시간 내에 끝나지 않은 시나리오 ID
+    failed: List[str] = []  # 평가 중 오류가 난 시나리오 ID
 
 
 class PromptImproveResponse(BaseModel):
@@ -122,7 +179,16 @@ class PromptImproveResponse(BaseModel):
     reevaluation: Optional[ReEvaluationResult] = None
 
 
+class PromptVersionSummary(BaseModel):
+    """본문을 제외한 프롬프트 버전 목록 항목"""
+    id: str
+    created_at: str
+    score: Optional[float] = None
+    notes: Optional[str] = None
+
+
 class PromptHistoryResponse(BaseModel):
-    """프롬프트 히스토리 응답"""
-    current_version: str
-    versions: List[PromptVersion]
+    """프롬프트 히스토리 응답 (최신순, 커서 기반 페이지)"""
+    current_version: Optional[str]
+    versions: List[PromptVersionSummary]
+    next_cursor: Optional[str] = None  # 다음 페이지 요청 시 cursor로 전달
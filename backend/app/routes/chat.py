@@ -1,17 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import ChatRequest, ChatResponse, DocumentUpload
-from app.dependencies import rag_service, compliance_checker
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from app.models.schemas import ChatRequest, ChatResponse, DocumentUpload, RetrievalRequest, RetrievalResponse
+from app.dependencies import get_compliance_checker, get_compliance_jobs, get_rag_service, get_upload_jobs
+from app.services.compliance_checker import ComplianceChecker
+from app.services.compliance_jobs import ComplianceJobRunner, ComplianceQueueFull
+from app.services.rag_service import RAGService
+from app.services.upload_jobs import UploadJobRunner, detect_format
+import asyncio
+import io
+import json
+import os
 import uuid
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
 @router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(
+    request: ChatRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+    compliance_jobs: ComplianceJobRunner = Depends(get_compliance_jobs),
+):
     """채팅 메시지 전송 및 응답 생성"""
+    # 준수도 분석 큐가 가득 차면 LLM 호출 전에 거절
+    if not compliance_jobs.accepting:
+        raise HTTPException(status_code=503, detail="Compliance analysis queue is full", headers={"Retry-After": "5"})
     try:
         # RAG 챗봇으로 응답 생성
-        result = rag_service.chat(
+        result = await rag_service.achat(
             message=request.message,
             system_prompt=request.system_prompt.content,
             conversation_history=[
@@ -22,49 +38,190 @@ async def send_message(request: ChatRequest):
             model_name=request.model_name
         )
 
-        # 준수도 분석
-        compliance_analysis = compliance_checker.analyze_compliance(
-            system_prompt_guidelines=request.system_prompt.guidelines,
+        # 준수도 분석은 백그라운드에서 실행 (결과는 /api/compliance/{id}로 조회)
+        compliance_id = await compliance_jobs.submit(
+            guidelines=request.system_prompt.guidelines,
             user_message=request.message,
             assistant_response=result["response"],
             llm_provider=request.llm_provider,
-            model_name=request.model_name
+            model_name=request.model_name,
+            bypass_cache=request.bypass_cache
         )
 
         return ChatResponse(
             response=result["response"],
             context_used=result["context_used"],
-            compliance_id=compliance_analysis.compliance_id
+            compliance_id=compliance_id,
+            compliance_status="pending"
         )
 
+    except ComplianceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/upload-document")
-async def upload_document(doc: DocumentUpload):
-    """문서를 RAG 시스템에 업로드"""
-    try:
-        # 문서를 청크로 나누기 (간단한 예제)
-        chunks = [doc.content[i:i+500] for i in range(0, len(doc.content), 500)]
+def _sse(event: str, data) -> str:
+    """Server-Sent Events 프레임 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def stream_message(
+    request: ChatRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+    compliance_jobs: ComplianceJobRunner = Depends(get_compliance_jobs),
+):
+    """채팅 응답을 SSE로 스트리밍 (context → token... → compliance → done)"""
+    if not compliance_jobs.accepting:
+        raise HTTPException(status_code=503, detail="Compliance analysis queue is full", headers={"Retry-After": "5"})
+
+    async def event_stream():
+        try:
+            chunks = []
+            async for event in rag_service.astream_chat(
+                message=request.message,
+                system_prompt=request.system_prompt.content,
+                conversation_history=[
+                    {"role": msg.role, "content": msg.content}
+                    for msg in request.conversation_history
+                ] if request.conversation_history else None,
+                llm_provider=request.llm_provider,
+                model_name=request.model_name
+            ):
+                if event["type"] == "context":
+                    yield _sse("context", {"context_used": event["context_used"]})
+                else:
+                    chunks.append(event["content"])
+                    yield _sse("token", {"content": event["content"]})
+
+            # 전체 응답 기준 준수도 분석 (백그라운드)
+            compliance_id = await compliance_jobs.submit(
+                guidelines=request.system_prompt.guidelines,
+                user_message=request.message,
+                assistant_response="".join(chunks),
+                llm_provider=request.llm_provider,
+                model_name=request.model_name,
+                bypass_cache=request.bypass_cache
+            )
+            yield _sse("compliance", {"compliance_id": compliance_id, "status": "pending"})
+            yield _sse("done", {})
+
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-        # 메타데이터 설정
-        metadatas = [doc.metadata or {} for _ in chunks]
 
-        # 문서 추가
-        ids = rag_service.add_documents(chunks, metadatas)
+@router.post("/upload-document")
+async def upload_document(
+    doc: DocumentUpload,
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """문서를 RAG 시스템에 업로드
+
+    metadata.source를 지정하면 같은 문서를 다시 올릴 때 바뀐 청크만 반영하고
+    더 이상 없는 청크는 삭제한다.
+    """
+    try:
+        # 청크 분할과 임베딩은 CPU 작업이므로 스레드에서 실행
+        report = await asyncio.to_thread(rag_service.ingest_document, doc.content, doc.metadata)
 
         return {
             "message": "Document uploaded successfully",
-            "chunks_added": len(ids)
+            "chunks_added": report["added"],
+            **report
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/upload-file", status_code=202)
+async def upload_file(
+    file: UploadFile = File(...),
+    source: str = Form(None),
+    format: str = Form(None),
+    metadata: str = Form(None),
+    upload_jobs: UploadJobRunner = Depends(get_upload_jobs),
+):
+    """대용량 지식 파일(text/markdown/JSONL) 업로드 후 백그라운드 수집
+
+    Starlette가 받아 둔 임시 파일을 줄 단위로 읽으며 청크/임베딩하므로
+    파일 크기와 무관하게 메모리 사용량이 일정하다. 진행 상황은
+    /upload-jobs/{job_id}로 확인한다.
+    """
+    try:
+        file_format = detect_format(file.filename, format)
+        extra = json.loads(metadata) if metadata else {}
+        if not isinstance(extra, dict):
+            raise ValueError("metadata must be a JSON object")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Starlette가 이미 임시 파일로 받아 둔 업로드를 그대로 작업에 넘긴다.
+    # 응답 후 FastAPI가 닫는 것은 빈 자리표시 객체이고, 원본은 작업이 끝날 때 닫는다.
+    spooled, file.file = file.file, io.BytesIO()
+    job = upload_jobs.submit(
+        spooled,
+        filename=file.filename,
+        file_format=file_format,
+        metadata={**extra, "source": source or file.filename},
+    )
+    return job
+
+
+@router.post("/retrieve", response_model=RetrievalResponse)
+async def retrieve_contexts(
+    request: RetrievalRequest,
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """여러 쿼리(시나리오 세트 등)의 컨텍스트를 한 번에 검색
+
+    오프라인 평가 작업용: 쿼리를 묶어서 임베딩/검색하므로 건별 호출보다 빠르다.
+    """
+    max_queries = int(os.getenv("RAG_RETRIEVE_MAX_QUERIES", "5000"))
+    if len(request.queries) > max_queries:
+        raise HTTPException(status_code=400, detail=f"At most {max_queries} queries per request")
+    try:
+        contexts = await asyncio.to_thread(rag_service.retrieve_many, request.queries, request.n_results)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return RetrievalResponse(results=[
+        {"query": query, "context": context}
+        for query, context in zip(request.queries, contexts)
+    ])
+
+
+@router.get("/retrieval-cache/stats")
+async def get_retrieval_cache_stats(
+    rag_service: RAGService = Depends(get_rag_service),
+):
+    """RAG 검색 캐시(쿼리 임베딩/검색 결과) 적중률과 절약한 시간 조회"""
+    return rag_service.retrieval_cache.stats()
+
+
+@router.get("/upload-jobs/{job_id}")
+async def get_upload_job(
+    job_id: str,
+    upload_jobs: UploadJobRunner = Depends(get_upload_jobs),
+):
+    """파일 수집 작업 진행 상황 조회"""
+    job = upload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
+
 @router.post("/extract-guidelines")
-async def extract_guidelines(request: dict):
+async def extract_guidelines(
+    request: dict,
+    compliance_checker: ComplianceChecker = Depends(get_compliance_checker),
+):
     """시스템 프롬프트에서 가이드라인 자동 추출 (LLM 기반)"""
     try:
         system_prompt = request.get("system_prompt", "")
@@ -74,10 +231,11 @@ async def extract_guidelines(request: dict):
         llm_provider = request.get("llm_provider", "upstage")
         model_name = request.get("model_name")
 
-        guidelines = compliance_checker.extract_guidelines(
+        guidelines = await compliance_checker.aextract_guidelines(
             system_prompt,
             llm_provider=llm_provider,
-            model_name=model_name
+            model_name=model_name,
+            refresh=bool(request.get("refresh", False))
         )
 
         return {
@@ -1,15 +1,40 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.models.schemas import ComplianceAnalysis
-from app.dependencies import compliance_checker
+from app.dependencies import get_compliance_checker, get_compliance_jobs
+from app.services.compliance_checker import ComplianceChecker
+from app.services.compliance_jobs import ComplianceJobRunner
 
 router = APIRouter(prefix="/api/compliance", tags=["compliance"])
 
 
+@router.get("/cache/stats")
+async def get_judgment_cache_stats(
+    compliance_checker: ComplianceChecker = Depends(get_compliance_checker)
+):
+    """준수도 판정 캐시 적중/미스 통계 조회"""
+    try:
+        return await asyncio.to_thread(compliance_checker.judgment_cache.stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{compliance_id}", response_model=ComplianceAnalysis)
-async def get_compliance_analysis(compliance_id: str):
-    """준수도 분석 결과 조회"""
+async def get_compliance_analysis(
+    compliance_id: str,
+    wait: float = Query(0, ge=0, le=60, description="pending 상태일 때 결과를 기다릴 최대 시간(초)"),
+    compliance_checker: ComplianceChecker = Depends(get_compliance_checker),
+    compliance_jobs: ComplianceJobRunner = Depends(get_compliance_jobs)
+):
+    """준수도 분석 결과 조회 (status: pending/done/failed, wait>0이면 long-poll)"""
     try:
-        analysis = compliance_checker.get_analysis(compliance_id)
+        if wait > 0:
+            analysis = await compliance_jobs.wait_for(compliance_id, timeout=wait)
+        else:
+            analysis = await asyncio.to_thread(compliance_checker.get_analysis, compliance_id)
 
         if not analysis:
             raise HTTPException(status_code=404, detail="Analysis not found")
@@ -20,3 +45,32 @@ async def get_compliance_analysis(compliance_id: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{compliance_id}/events")
+async def stream_compliance_analysis(
+    compliance_id: str,
+    timeout: float = Query(120, gt=0, le=600),
+    compliance_checker: ComplianceChecker = Depends(get_compliance_checker),
+    compliance_jobs: ComplianceJobRunner = Depends(get_compliance_jobs)
+):
+    """준수도 분석 결과를 SSE로 전달 (status 이벤트 후 완료 시 analysis 이벤트)"""
+    analysis = await asyncio.to_thread(compliance_checker.get_analysis, compliance_id)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+
+    async def event_stream():
+        yield f"event: status\ndata: {json.dumps({'status': analysis.status})}\n\n"
+        result = analysis
+        if result.status == "pending":
+            result = await compliance_jobs.wait_for(compliance_id, timeout=timeout)
+        if result is None or result.status == "pending":
+            yield f"event: timeout\ndata: {json.dumps({'status': 'pending'})}\n\n"
+            return
+        yield f"event: analysis\ndata: {result.model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
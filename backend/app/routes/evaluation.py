@@ -1,26 +1,160 @@
-from typing import List
+import asyncio
+import json
+import tempfile
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from app.dependencies import evaluation_service
-from app.models.schemas import EvaluationRequest, EvaluationResult
+from app.dependencies import get_evaluation_service
+from app.models.schemas import (
+    EvaluationPage,
+    EvaluationRequest,
+    EvaluationResult,
+    EvaluationStatsResponse,
+)
+from app.services.evaluation_service import EvaluationService
 
 router = APIRouter(prefix="/api/evaluation", tags=["evaluation"])
 
+# NDJSON 배치 본문을 메모리에 두는 최대 크기 (넘으면 임시 파일로)
+BATCH_SPOOL_MAX_MEMORY = 1 << 20
+
 
 @router.post("/run", response_model=EvaluationResult)
-async def run_evaluation(request: EvaluationRequest):
+async def run_evaluation(
+    request: EvaluationRequest,
+    evaluation_service: EvaluationService = Depends(get_evaluation_service),
+):
     """프롬프트 평가 실행"""
     try:
-        return evaluation_service.evaluate(request)
+        return await evaluation_service.aevaluate(request)
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.post("/batch")
+async def run_batch_evaluation(
+    request: Request,
+    concurrency: Optional[int] = Query(None, ge=1, le=64, description="LLM 프로바이더별 동시 평가 수"),
+    chunk_size: Optional[int] = Query(None, ge=1, le=5000, description="한 트랜잭션에 저장할 평가 수"),
+    evaluation_service: EvaluationService = Depends(get_evaluation_service),
+):
+    """여러 평가를 병렬 실행하고 완료되는 순서대로 NDJSON으로 스트리밍
+
+    본문은 EvaluationRequest의 JSON 배열 또는 NDJSON(application/x-ndjson)을 받는다.
+    NDJSON 본문은 임시 파일에 받아 두고 한 줄씩 읽어 평가에 넘기므로 배치 크기와
+    무관하게 메모리 사용량이 일정하다.
+    각 응답 줄은 {"index": i, "result": {...}} 또는 {"index": i, "error": "..."} 형식이다.
+    """
+    spool: Optional[BinaryIO] = None
+    if "ndjson" in request.headers.get("content-type", ""):
+        spool = await _spool_body(request)
+        try:
+            await asyncio.to_thread(_validate_ndjson, spool)
+        except BaseException:
+            spool.close()
+            raise
+        requests: Iterable[EvaluationRequest] = _iter_ndjson(spool)
+    else:
+        body = await request.body()
+        try:
+            items = json.loads(body)
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid batch body: {exc}") from exc
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Batch body must be a JSON array or NDJSON")
+        requests = [_validate_item(index, item) for index, item in enumerate(items)]
+
+    async def result_stream():
+        try:
+            async for index, result, error in evaluation_service.abatch_evaluate(
+                requests, concurrency=concurrency, chunk_size=chunk_size
+            ):
+                if error is not None:
+                    line = {"index": index, "error": error}
+                else:
+                    line = {"index": index, "result": result.model_dump()}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            if spool is not None:
+                spool.close()
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+
+async def _spool_body(request: Request) -> BinaryIO:
+    """요청 본문을 메모리 상한이 있는 임시 파일에 받는다 (상한을 넘으면 디스크로 옮겨짐)."""
+    spool = tempfile.SpooledTemporaryFile(max_size=BATCH_SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in request.stream():
+            await asyncio.to_thread(spool.write, chunk)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def _ndjson_lines(spool: BinaryIO) -> Iterator[Tuple[int, bytes]]:
+    spool.seek(0)
+    index = 0
+    for line in spool:
+        if line.strip():
+            yield index, line
+            index += 1
+
+
+def _validate_item(index: int, item: Any) -> EvaluationRequest:
+    try:
+        return EvaluationRequest.model_validate(item)
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=f"Item {index}: {exc}") from exc
+
+
+def _validate_ndjson(spool: BinaryIO) -> None:
+    """스트리밍 시작 전에 모든 줄을 검사해 기존처럼 400/422로 거절한다."""
+    for index, line in _ndjson_lines(spool):
+        try:
+            item = json.loads(line)
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid batch body: line {index}: {exc}") from exc
+        _validate_item(index, item)
+
+
+def _iter_ndjson(spool: BinaryIO) -> Iterator[EvaluationRequest]:
+    # 검사를 통과한 파일이므로 여기서는 다시 파싱만 한다; abatch_evaluate가 빈 자리만큼만 당겨 간다.
+    for _, line in _ndjson_lines(spool):
+        yield EvaluationRequest.model_validate_json(line)
+
+
+@router.get("/recent", response_model=EvaluationPage)
+async def recent_evaluations(
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    evaluation_service: EvaluationService = Depends(get_evaluation_service),
+):
+    """최근 평가 결과 조회 (최신순, 커서 기반 페이지)"""
+    try:
+        # 대기 중인 배치 쓰기를 기다릴 수 있으므로 스레드풀에서 실행
+        return await asyncio.to_thread(evaluation_service.evaluations_page, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
-@router.get("/recent", response_model=List[EvaluationResult])
-async def recent_evaluations(limit: int = Query(10, ge=1, le=50)):
-    """최근 평가 결과 조회"""
+@router.get("/stats", response_model=EvaluationStatsResponse)
+async def evaluation_stats(
+    days: int = Query(30, ge=1, le=365, description="시계열에 포함할 최근 일수"),
+    prompt_version: Optional[str] = Query(None, description="특정 프롬프트 버전만 조회"),
+    top: int = Query(10, ge=1, le=100, description="가장 많이 위반된 가이드라인 수"),
+    evaluation_service: EvaluationService = Depends(get_evaluation_service),
+):
+    """프롬프트 버전 × 일자별 평균 점수와 가장 많이 위반된 가이드라인 (집계 테이블 조회)"""
     try:
-        return evaluation_service.recent_evaluations(limit=limit)
+        return await asyncio.to_thread(
+            evaluation_service.stats_snapshot, days=days, prompt_version=prompt_version, top=top
+        )
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=500, detail=str(exc)) from exc
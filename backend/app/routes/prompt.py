@@ -1,22 +1,108 @@
-from fastapi import APIRouter, HTTPException
+import json
 
-from app.dependencies import prompt_improver
-from app.models.schemas import PromptHistoryResponse, PromptImproveRequest, PromptImproveResponse
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import get_compliance_checker, get_prompt_improver, get_prompt_store
+from app.models.schemas import (
+    PromptHistoryResponse,
+    PromptImproveRequest,
+    PromptImproveResponse,
+    PromptVersion,
+)
+from app.services.compliance_checker import ComplianceChecker
+from app.services.prompt_improver import PromptImproverService
+from app.services.prompt_store import PromptStore
 
 router = APIRouter(prefix="/api/prompts", tags=["prompts"])
 
 
 @router.get("/history", response_model=PromptHistoryResponse)
-async def get_history():
+async def get_history(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
+    prompt_improver: PromptImproverService = Depends(get_prompt_improver),
+):
+    """프롬프트 버전 목록 (본문 제외, 최신순 페이지)"""
+    try:
+        return prompt_improver.history(limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.get("/versions/{version_id}", response_model=PromptVersion)
+async def get_version(
+    version_id: str,
+    prompt_store: PromptStore = Depends(get_prompt_store),
+):
+    """프롬프트 버전 본문 조회"""
+    try:
+        return prompt_store.get_version(version_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+
+
+@router.get("/storage-report")
+async def storage_report(
+    prompt_store: PromptStore = Depends(get_prompt_store),
+):
+    """중복 제거된 프롬프트 본문 저장소의 절약 공간 보고"""
     try:
-        return prompt_improver.history()
+        return prompt_store.storage_report()
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.post("/improve", response_model=PromptImproveResponse)
-async def improve_prompt(request: PromptImproveRequest):
+async def improve_prompt(
+    request: PromptImproveRequest,
+    prompt_improver: PromptImproverService = Depends(get_prompt_improver),
+):
+    try:
+        return await prompt_improver.aimprove(request)
+    except Exception as exc:  # pylint: disable=broad-except
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.post("/improve/stream")
+async def improve_prompt_stream(
+    request: PromptImproveRequest,
+    prompt_improver: PromptImproverService = Depends(get_prompt_improver),
+):
+    """새 버전 생성 후 재평가 결과를 완료되는 대로 NDJSON으로 스트리밍"""
+
+    async def event_stream():
+        try:
+            async for event in prompt_improver.astream_improve(request):
+                payload = {
+                    key: value.model_dump() if hasattr(value, "model_dump") else value
+                    for key, value in event.items()
+                }
+                yield json.dumps(payload, ensure_ascii=False) + "\n"
+        except Exception as exc:  # pylint: disable=broad-except
+            yield json.dumps({"type": "error", "error": str(exc)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@router.post("/precompute-guidelines")
+async def precompute_guidelines(
+    request: dict,
+    prompt_store: PromptStore = Depends(get_prompt_store),
+    compliance_checker: ComplianceChecker = Depends(get_compliance_checker),
+):
+    """저장된 모든 프롬프트 버전의 가이드라인을 미리 추출하여 캐시"""
     try:
-        return prompt_improver.improve(request)
+        versions = prompt_store.list_versions()
+        return await compliance_checker.aprecompute_guidelines(
+            [version.content for version in versions],
+            llm_provider=request.get("llm_provider", "upstage"),
+            model_name=request.get("model_name"),
+            concurrency=int(request.get("concurrency", 4)),
+        )
     except Exception as exc:  # pylint: disable=broad-except
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -0,0 +1,109 @@
+"""SQLite-backed compliance analysis storage with a bounded hot cache."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from app.db import db, utc_timestamp
+from app.models.schemas import ComplianceAnalysis, GuidelineCompliance
+
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+class AnalysisStore:
+    """Persists ComplianceAnalysis rows so any worker can serve them, fronted by a small LRU."""
+
+    def __init__(self, hot_cache_size: Optional[int] = None) -> None:
+        self.db = db
+        self.hot_cache_size = (
+            hot_cache_size if hot_cache_size is not None else int(os.getenv("ANALYSIS_HOT_CACHE_SIZE", "256"))
+        )
+        self._hot: "OrderedDict[str, ComplianceAnalysis]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_pending(self, compliance_id: str) -> ComplianceAnalysis:
+        analysis = ComplianceAnalysis(
+            compliance_id=compliance_id,
+            overall_score=0.0,
+            guideline_results=[],
+            summary="준수도 분석 진행 중",
+            status="pending",
+        )
+        self.save(analysis)
+        return analysis
+
+    def mark_failed(self, compliance_id: str, error: str) -> ComplianceAnalysis:
+        analysis = ComplianceAnalysis(
+            compliance_id=compliance_id,
+            overall_score=0.0,
+            guideline_results=[],
+            summary="준수도 분석 실패",
+            status="failed",
+            error=error,
+        )
+        self.save(analysis)
+        return analysis
+
+    def save(self, analysis: ComplianceAnalysis) -> None:
+        self.db.execute(
+            """
+            INSERT OR REPLACE INTO compliance_analyses (
+                compliance_id, status, overall_score, summary, guideline_results, error, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                analysis.compliance_id,
+                analysis.status,
+                analysis.overall_score,
+                analysis.summary,
+                json.dumps([item.model_dump() for item in analysis.guideline_results], ensure_ascii=False),
+                analysis.error,
+                utc_timestamp(),
+            ),
+        )
+        self._remember(analysis)
+
+    def get(self, compliance_id: str) -> Optional[ComplianceAnalysis]:
+        with self._lock:
+            analysis = self._hot.get(compliance_id)
+            if analysis is not None:
+                self._hot.move_to_end(compliance_id)
+                return analysis
+
+        rows = self.db.query(
+            """
+            SELECT compliance_id, status, overall_score, summary, guideline_results, error
+            FROM compliance_analyses WHERE compliance_id=?
+            """,
+            (compliance_id,),
+        )
+        if not rows:
+            return None
+        analysis = self._row_to_analysis(rows[0])
+        self._remember(analysis)
+        return analysis
+
+    def _remember(self, analysis: ComplianceAnalysis) -> None:
+        # Pending rows may be completed by another worker, so only terminal results are hot-cached.
+        with self._lock:
+            if analysis.status not in TERMINAL_STATUSES:
+                self._hot.pop(analysis.compliance_id, None)
+                return
+            self._hot[analysis.compliance_id] = analysis
+            self._hot.move_to_end(analysis.compliance_id)
+            while len(self._hot) > self.hot_cache_size:
+                self._hot.popitem(last=False)
+
+    def _row_to_analysis(self, row) -> ComplianceAnalysis:
+        return ComplianceAnalysis(
+            compliance_id=row["compliance_id"],
+            overall_score=row["overall_score"],
+            summary=row["summary"],
+            guideline_results=[GuidelineCompliance(**item) for item in json.loads(row["guideline_results"])],
+            status=row["status"],
+            error=row["error"],
+        )
@@ -1,16 +1,39 @@
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import ContextManager, List, Dict, Optional, Tuple
+import asyncio
 import json
+import os
 import uuid
 from app.models.schemas import GuidelineCompliance, ComplianceAnalysis
-from app.services.llm_provider import get_default_llm
+from app.services.analysis_store import AnalysisStore
+from app.services.guideline_cache import GuidelineExtractionCache
+from app.services.judgment_cache import JudgmentCache
+from app.services.llm_provider import LLMProvider, get_default_llm, lease_llm_provider
+
+MISSING_RESULT_EXPLANATION = "분석 결과를 찾을 수 없음"
+
+# (원래 가이드라인 인덱스, 가이드라인) 목록
+Shard = List[Tuple[int, str]]
 
 
 class ComplianceChecker:
     """시스템 프롬프트 준수도 검사 서비스"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        judgment_cache: Optional[JudgmentCache] = None,
+        analysis_store: Optional[AnalysisStore] = None,
+        guideline_cache: Optional[GuidelineExtractionCache] = None
+    ):
         self.llm = get_default_llm()
-        self.analysis_cache = {}  # 분석 결과 캐시
+        self.analysis_store = analysis_store or AnalysisStore()  # 분석 결과 저장소 (SQLite + LRU)
+        self.judgment_cache = judgment_cache or JudgmentCache()  # 동일 입력에 대한 LLM 판정 캐시
+        self.guideline_cache = guideline_cache or GuidelineExtractionCache()  # 프롬프트별 가이드라인 추출 캐시
+        # 가이드라인이 많으면 샤드 단위로 나누어 병렬 판정, 실패한 샤드만 재시도
+        self.shard_size = int(os.getenv("COMPLIANCE_SHARD_SIZE", "10"))
+        self.shard_concurrency = int(os.getenv("COMPLIANCE_SHARD_CONCURRENCY", "4"))
+        self.shard_retries = int(os.getenv("COMPLIANCE_SHARD_RETRIES", "1"))
 
     def analyze_compliance(
         self,
@@ -18,21 +41,71 @@ class ComplianceChecker:
         user_message: str,
         assistant_response: str,
         llm_provider: str = None,
-        model_name: str = None
+        model_name: str = None,
+        bypass_cache: bool = False
     ) -> ComplianceAnalysis:
         """시스템 프롬프트 준수도 분석"""
 
-        compliance_id = str(uuid.uuid4())
-
         # 모든 가이드라인을 한 번에 분석
         guideline_results = self._check_all_guidelines(
             guidelines=system_prompt_guidelines,
             user_message=user_message,
             assistant_response=assistant_response,
             llm_provider=llm_provider,
-            model_name=model_name
+            model_name=model_name,
+            bypass_cache=bypass_cache
+        )
+
+        return self._build_analysis(guideline_results)
+
+    async def aanalyze_compliance(
+        self,
+        system_prompt_guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        llm_provider: str = None,
+        model_name: str = None,
+        bypass_cache: bool = False,
+        compliance_id: str = None
+    ) -> ComplianceAnalysis:
+        """시스템 프롬프트 준수도 분석 (비동기)"""
+
+        guideline_results = await self._acheck_all_guidelines(
+            guidelines=system_prompt_guidelines,
+            user_message=user_message,
+            assistant_response=assistant_response,
+            llm_provider=llm_provider,
+            model_name=model_name,
+            bypass_cache=bypass_cache
         )
 
+        analysis = self._make_analysis(guideline_results, compliance_id)
+        # SQLite 쓰기는 잠금 대기가 있을 수 있으므로 이벤트 루프 밖에서 저장
+        await asyncio.to_thread(self.analysis_store.save, analysis)
+        return analysis
+
+    def _build_analysis(
+        self,
+        guideline_results: List[GuidelineCompliance],
+        compliance_id: str = None
+    ) -> ComplianceAnalysis:
+        """가이드라인 결과로 분석 객체 생성 후 저장"""
+        analysis = self._make_analysis(guideline_results, compliance_id)
+
+        # 저장소에 저장 (다른 워커/재시작 후에도 조회 가능)
+        self.analysis_store.save(analysis)
+
+        return analysis
+
+    def _make_analysis(
+        self,
+        guideline_results: List[GuidelineCompliance],
+        compliance_id: str = None
+    ) -> ComplianceAnalysis:
+        """가이드라인 결과로 분석 객체 생성"""
+
+        compliance_id = compliance_id or str(uuid.uuid4())
+
         # 전체 점수 계산
         followed_count = sum(1 for r in guideline_results if r.followed)
         overall_score = (followed_count / len(guideline_results) * 100) if guideline_results else 0
@@ -40,17 +113,18 @@ class ComplianceChecker:
         # 요약 생성
         summary = self._generate_summary(guideline_results, overall_score)
 
-        analysis = ComplianceAnalysis(
+        return ComplianceAnalysis(
             compliance_id=compliance_id,
             overall_score=overall_score,
             guideline_results=guideline_results,
             summary=summary
         )
 
-        # 캐시에 저장
-        self.analysis_cache[compliance_id] = analysis
-
-        return analysis
+    def _resolve_llm(self, llm_provider: str = None, model_name: str = None) -> ContextManager[LLMProvider]:
+        """요청별 LLM 선택 (with 블록 동안은 유휴 정리로 닫히지 않음)"""
+        if llm_provider:
+            return lease_llm_provider(llm_provider, model_name)
+        return nullcontext(self.llm)
 
     def _check_all_guidelines(
         self,
@@ -58,24 +132,215 @@ class ComplianceChecker:
         user_message: str,
         assistant_response: str,
         llm_provider: str = None,
-        model_name: str = None
+        model_name: str = None,
+        bypass_cache: bool = False
     ) -> List[GuidelineCompliance]:
-        """모든 가이드라인을 한 번에 분석"""
+        """가이드라인을 샤드 단위로 나누어 분석"""
 
         if not guidelines:
             return []
 
         # LLM 선택
-        from app.services.llm_provider import get_llm_provider
-        if llm_provider:
-            llm = get_llm_provider(llm_provider, model_name)
-        else:
-            llm = self.llm
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            cache_key, cached = self._lookup_judgment(llm, guidelines, user_message, assistant_response, bypass_cache)
+            if cached is not None:
+                return cached
+
+            shards = self._shard_guidelines(guidelines)
+            if len(shards) == 1:
+                outcomes = [self._judge_shard(llm, shards[0], user_message, assistant_response)]
+            else:
+                with ThreadPoolExecutor(max_workers=min(len(shards), self.shard_concurrency)) as pool:
+                    outcomes = list(pool.map(
+                        lambda shard: self._judge_shard(llm, shard, user_message, assistant_response),
+                        shards
+                    ))
+
+            results, complete = self._merge_judgments(guidelines, shards, outcomes)
+            if complete:
+                self.judgment_cache.put(cache_key, results)
+            return results
+
+    async def _acheck_all_guidelines(
+        self,
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        llm_provider: str = None,
+        model_name: str = None,
+        bypass_cache: bool = False
+    ) -> List[GuidelineCompliance]:
+        """가이드라인을 샤드 단위로 나누어 분석 (비동기)"""
+
+        if not guidelines:
+            return []
+
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            cache_key, cached = await self._alookup_judgment(llm, guidelines, user_message, assistant_response, bypass_cache)
+            if cached is not None:
+                return cached
+
+            semaphore = asyncio.Semaphore(self.shard_concurrency)
+
+            async def judge(shard: Shard):
+                async with semaphore:
+                    return await self._ajudge_shard(llm, shard, user_message, assistant_response)
+
+            shards = self._shard_guidelines(guidelines)
+            outcomes = await asyncio.gather(*(judge(shard) for shard in shards))
+
+            results, complete = self._merge_judgments(guidelines, shards, outcomes)
+            if complete:
+                # put은 SQLite 쓰기(가끔 prune 포함)이므로 스레드에서 실행
+                await asyncio.to_thread(self.judgment_cache.put, cache_key, results)
+            return results
+
+    def _shard_guidelines(self, guidelines: List[str]) -> List[Shard]:
+        """가이드라인을 shard_size 크기로 분할 (원래 인덱스 유지)"""
+        indexed = list(enumerate(guidelines))
+        size = max(self.shard_size, 1)
+        return [indexed[i:i + size] for i in range(0, len(indexed), size)]
+
+    def _judge_shard(
+        self,
+        llm,
+        shard: Shard,
+        user_message: str,
+        assistant_response: str
+    ) -> Tuple[Dict[int, Dict], Optional[Exception]]:
+        """샤드 하나를 판정, 오류나 누락된 항목만 골라 shard_retries회까지 재시도"""
+        found: Dict[int, Dict] = {}
+        remaining = shard
+        error = None
+        for _ in range(self.shard_retries + 1):
+            prompt = self._build_judge_prompt([g for _, g in remaining], user_message, assistant_response)
+            try:
+                result_text = llm.chat(
+                    messages=[{"role": "user", "content": prompt}],
+                    json_format=True
+                )
+                remaining = self._collect_shard_items(remaining, result_text, found)
+                error = None
+            except Exception as e:
+                print(f"Compliance check error: {e}")
+                error = e
+            if not remaining:
+                break
+        return found, error
+
+    async def _ajudge_shard(
+        self,
+        llm,
+        shard: Shard,
+        user_message: str,
+        assistant_response: str
+    ) -> Tuple[Dict[int, Dict], Optional[Exception]]:
+        """샤드 하나를 판정 (비동기)"""
+        found: Dict[int, Dict] = {}
+        remaining = shard
+        error = None
+        for _ in range(self.shard_retries + 1):
+            prompt = self._build_judge_prompt([g for _, g in remaining], user_message, assistant_response)
+            try:
+                result_text = await llm.achat(
+                    messages=[{"role": "user", "content": prompt}],
+                    json_format=True
+                )
+                remaining = self._collect_shard_items(remaining, result_text, found)
+                error = None
+            except Exception as e:
+                print(f"Compliance check error: {e}")
+                error = e
+            if not remaining:
+                break
+        return found, error
+
+    def _collect_shard_items(self, remaining: Shard, result_text: str, found: Dict[int, Dict]) -> Shard:
+        """판정 결과를 원래 인덱스로 매핑하여 found에 추가하고, 아직 결과가 없는 항목 반환"""
+        items = self._parse_judge_items(result_text)
+        for local_index, (global_index, _) in enumerate(remaining, 1):
+            if local_index in items:
+                found[global_index] = items[local_index]
+        return [(i, g) for i, g in remaining if i not in found]
+
+    def _merge_judgments(
+        self,
+        guidelines: List[str],
+        shards: List[Shard],
+        outcomes: List[Tuple[Dict[int, Dict], Optional[Exception]]]
+    ) -> Tuple[List[GuidelineCompliance], bool]:
+        """샤드별 결과를 원래 순서로 병합, 모든 항목이 판정되었는지 함께 반환"""
+        found: Dict[int, Dict] = {}
+        errors: Dict[int, Exception] = {}
+        for shard, (shard_found, error) in zip(shards, outcomes):
+            found.update(shard_found)
+            if error is not None:
+                for index, _ in shard:
+                    errors[index] = error
+
+        results = []
+        for i, guideline in enumerate(guidelines):
+            item = found.get(i)
+            if item is not None:
+                results.append(GuidelineCompliance(
+                    guideline=guideline,
+                    followed=item.get("followed", False),
+                    explanation=item.get("explanation", "분석 실패"),
+                    evidence=item.get("evidence")
+                ))
+            elif i in errors:
+                results.append(self._failed_results([guideline], errors[i])[0])
+            else:
+                # 결과가 없는 경우
+                results.append(GuidelineCompliance(
+                    guideline=guideline,
+                    followed=False,
+                    explanation=MISSING_RESULT_EXPLANATION,
+                    evidence=None
+                ))
+
+        return results, len(found) == len(guidelines)
+
+    def _lookup_judgment(
+        self,
+        llm,
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        bypass_cache: bool
+    ) -> Tuple[str, Optional[List[GuidelineCompliance]]]:
+        """판정 캐시 조회 (bypass_cache=True면 항상 새로 판정)"""
+        cache_key = JudgmentCache.make_key(guidelines, user_message, assistant_response, llm.get_model_name())
+        if bypass_cache:
+            self.judgment_cache.record_bypass()
+            return cache_key, None
+        return cache_key, self.judgment_cache.get(cache_key)
+
+    async def _alookup_judgment(
+        self,
+        llm,
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        bypass_cache: bool
+    ) -> Tuple[str, Optional[List[GuidelineCompliance]]]:
+        """판정 캐시 조회 (비동기): 메모리 LRU는 바로 확인하고 SQLite 조회만 스레드에서 실행"""
+        cache_key = JudgmentCache.make_key(guidelines, user_message, assistant_response, llm.get_model_name())
+        if bypass_cache:
+            self.judgment_cache.record_bypass()
+            return cache_key, None
+        cached = self.judgment_cache.peek(cache_key)
+        if cached is not None:
+            return cache_key, cached
+        return cache_key, await asyncio.to_thread(self.judgment_cache.get, cache_key)
+
+    def _build_judge_prompt(self, guidelines: List[str], user_message: str, assistant_response: str) -> str:
+        """가이드라인 판정용 프롬프트 생성"""
 
         # 가이드라인 목록 생성
         guidelines_text = "\n".join([f"{i+1}. {g}" for i, g in enumerate(guidelines)])
 
-        prompt = f"""Analyze if the assistant's response follows each guideline STRICTLY.
+        return f"""Analyze if the assistant's response follows each guideline STRICTLY.
 
 IMPORTANT RULES:
 - If a guideline requires something (e.g., "use Chinese"), check if that thing is ACTUALLY PRESENT in the response
@@ -118,57 +383,32 @@ Example format:
 Analyze each guideline carefully. Extract SPECIFIC EVIDENCE (quotes) from the response.
 Write the explanation in Korean. If no evidence exists for a required element, set followed=false."""
 
-        try:
-            result_text = llm.chat(
-                messages=[{"role": "user", "content": prompt}],
-                json_format=True
-            )
-            print(f"Compliance check response: {result_text}")
-
-            # JSON 파싱
-            data = json.loads(result_text)
-            results_data = data.get("results", [])
-
-            # 결과를 GuidelineCompliance 객체로 변환
-            results = []
-            for i, guideline in enumerate(guidelines):
-                # 해당 인덱스의 결과 찾기
-                result_item = None
-                for item in results_data:
-                    if item.get("guideline_index") == i + 1:
-                        result_item = item
-                        break
-
-                if result_item:
-                    results.append(GuidelineCompliance(
-                        guideline=guideline,
-                        followed=result_item.get("followed", False),
-                        explanation=result_item.get("explanation", "분석 실패"),
-                        evidence=result_item.get("evidence")
-                    ))
-                else:
-                    # 결과가 없는 경우
-                    results.append(GuidelineCompliance(
-                        guideline=guideline,
-                        followed=False,
-                        explanation="분석 결과를 찾을 수 없음",
-                        evidence=None
-                    ))
+    def _parse_judge_items(self, result_text: str) -> Dict[int, Dict]:
+        """판정 응답(JSON)을 guideline_index(1부터) → 결과 항목 맵으로 변환"""
+        print(f"Compliance check response: {result_text}")
 
-            return results
-
-        except Exception as e:
-            print(f"Compliance check error: {e}")
-            # 에러 발생 시 모든 가이드라인에 대해 기본값 반환
-            return [
-                GuidelineCompliance(
-                    guideline=g,
-                    followed=False,
-                    explanation=f"분석 중 오류 발생: {str(e)}",
-                    evidence=None
-                )
-                for g in guidelines
-            ]
+        # JSON 파싱
+        data = json.loads(result_text)
+        items: Dict[int, Dict] = {}
+        for item in data.get("results", []):
+            try:
+                index = int(item.get("guideline_index"))
+            except (TypeError, ValueError):
+                continue
+            items.setdefault(index, item)
+        return items
+
+    def _failed_results(self, guidelines: List[str], error: Exception) -> List[GuidelineCompliance]:
+        """에러 발생 시 모든 가이드라인에 대해 기본값 반환"""
+        return [
+            GuidelineCompliance(
+                guideline=g,
+                followed=False,
+                explanation=f"분석 중 오류 발생: {str(error)}",
+                evidence=None
+            )
+            for g in guidelines
+        ]
 
     def _check_single_guideline(
         self,
@@ -262,20 +502,109 @@ Write the explanation in Korean. If no evidence exists for a required element, s
         return summary
 
     def get_analysis(self, compliance_id: str) -> ComplianceAnalysis:
-        """캐시된 분석 결과 조회"""
-        return self.analysis_cache.get(compliance_id)
+        """저장된 분석 결과 조회"""
+        return self.analysis_store.get(compliance_id)
 
-    def extract_guidelines(self, system_prompt: str, llm_provider: str = None, model_name: str = None) -> List[str]:
-        """LLM을 사용하여 시스템 프롬프트에서 가이드라인 추출"""
-        from app.services.llm_provider import get_llm_provider
+    def extract_guidelines(
+        self,
+        system_prompt: str,
+        llm_provider: str = None,
+        model_name: str = None,
+        refresh: bool = False
+    ) -> List[str]:
+        """LLM을 사용하여 시스템 프롬프트에서 가이드라인 추출 (프롬프트 해시 기준 캐시)"""
 
         # 지정된 LLM 사용, 없으면 기본값
-        if llm_provider:
-            llm = get_llm_provider(llm_provider, model_name)
-        else:
-            llm = self.llm
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            prompt_hash = GuidelineExtractionCache.content_hash(system_prompt)
+            if not refresh:
+                cached = self.guideline_cache.get(prompt_hash, llm.get_model_name())
+                if cached is not None:
+                    return cached
+
+            prompt = self._build_extraction_prompt(system_prompt)
+
+            try:
+                result_text = llm.chat(
+                    messages=[{"role": "user", "content": prompt}],
+                    json_format=True,
+                    temperature=0.0  # 일관성을 위해 temperature를 0으로 설정
+                )
+                guidelines = self._parse_extracted_guidelines(result_text)
+                if guidelines:
+                    self.guideline_cache.put(prompt_hash, llm.get_model_name(), guidelines)
+                return guidelines
+
+            except Exception as e:
+                print(f"Guideline extraction error: {e}")
+                return []
+
+    async def aextract_guidelines(
+        self,
+        system_prompt: str,
+        llm_provider: str = None,
+        model_name: str = None,
+        refresh: bool = False
+    ) -> List[str]:
+        """LLM을 사용하여 시스템 프롬프트에서 가이드라인 추출 (비동기, 프롬프트 해시 기준 캐시)"""
+
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            prompt_hash = GuidelineExtractionCache.content_hash(system_prompt)
+            if not refresh:
+                # 캐시 조회/저장은 SQLite를 거치므로 스레드에서 실행
+                cached = await asyncio.to_thread(self.guideline_cache.get, prompt_hash, llm.get_model_name())
+                if cached is not None:
+                    return cached
+
+            prompt = self._build_extraction_prompt(system_prompt)
+
+            try:
+                result_text = await llm.achat(
+                    messages=[{"role": "user", "content": prompt}],
+                    json_format=True,
+                    temperature=0.0
+                )
+                guidelines = self._parse_extracted_guidelines(result_text)
+                if guidelines:
+                    await asyncio.to_thread(self.guideline_cache.put, prompt_hash, llm.get_model_name(), guidelines)
+                return guidelines
+
+            except Exception as e:
+                print(f"Guideline extraction error: {e}")
+                return []
+
+    async def aprecompute_guidelines(
+        self,
+        system_prompts: List[str],
+        llm_provider: str = None,
+        model_name: str = None,
+        concurrency: int = 4
+    ) -> Dict[str, int]:
+        """여러 프롬프트의 가이드라인을 미리 추출하여 캐시에 저장 (이미 캐시된 프롬프트는 건너뜀)"""
+
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            unique = {GuidelineExtractionCache.content_hash(p): p for p in system_prompts if p and p.strip()}
+            model = llm.get_model_name()
+            todo = await asyncio.to_thread(
+                lambda: [p for h, p in unique.items() if self.guideline_cache.get(h, model) is None]
+            )
+            semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+            async def extract(system_prompt: str) -> bool:
+                async with semaphore:
+                    return bool(await self.aextract_guidelines(system_prompt, llm_provider, model_name))
+
+            outcomes = await asyncio.gather(*(extract(p) for p in todo))
+            return {
+                "total": len(unique),
+                "cached": len(unique) - len(todo),
+                "extracted": sum(1 for ok in outcomes if ok),
+                "failed": sum(1 for ok in outcomes if not ok),
+            }
 
-        prompt = f"""Extract specific, actionable guidelines from the system prompt below.
+    def _build_extraction_prompt(self, system_prompt: str) -> str:
+        """가이드라인 추출용 프롬프트 생성"""
+        return f"""Extract specific, actionable guidelines from the system prompt below.
 
 RULES FOR EXTRACTION:
 1. Each guideline must be a CLEAR, SPECIFIC, and VERIFIABLE instruction
@@ -305,26 +634,18 @@ Return ONLY a JSON object with this exact format:
 
 Extract guidelines now:"""
 
-        try:
-            result_text = llm.chat(
-                messages=[{"role": "user", "content": prompt}],
-                json_format=True,
-                temperature=0.0  # 일관성을 위해 temperature를 0으로 설정
-            )
-            print(f"LLM response: {result_text}")  # 디버깅용
+    def _parse_extracted_guidelines(self, result_text: str) -> List[str]:
+        """추출 응답(JSON)을 가이드라인 리스트로 변환"""
+        print(f"LLM response: {result_text}")  # 디버깅용
 
-            # JSON 파싱
-            try:
-                data = json.loads(result_text)
-                if isinstance(data, dict) and "guidelines" in data:
-                    return [str(g).strip() for g in data["guidelines"] if g and len(str(g).strip()) > 3]
-                elif isinstance(data, list):
-                    return [str(g).strip() for g in data if g and len(str(g).strip()) > 3]
-            except json.JSONDecodeError as e:
-                print(f"JSON parse error: {e}, text: {result_text}")
-
-            return []
-
-        except Exception as e:
-            print(f"Guideline extraction error: {e}")
-            return []
+        # JSON 파싱
+        try:
+            data = json.loads(result_text)
+            if isinstance(data, dict) and "guidelines" in data:
+                return [str(g).strip() for g in data["guidelines"] if g and len(str(g).strip()) > 3]
+            elif isinstance(data, list):
+                return [str(g).strip() for g in data if g and len(str(g).strip()) > 3]
+        except json.JSONDecodeError as e:
+            print(f"JSON parse error: {e}, text: {result_text}")
+
+        return []
@@ -0,0 +1,153 @@
+"""Background compliance analysis on a bounded pool of asyncio workers."""
+from __future__ import annotations
+
+import asyncio
+import os
+import uuid
+from typing import Dict, List, Optional, Set
+
+from app.models.schemas import ComplianceAnalysis
+from app.services.analysis_store import TERMINAL_STATUSES
+from app.services.compliance_checker import ComplianceChecker
+
+
+class ComplianceQueueFull(RuntimeError):
+    """Raised by :meth:`ComplianceJobRunner.submit` when no more jobs can be accepted."""
+
+
+class ComplianceJobRunner:
+    """Runs ComplianceChecker.aanalyze_compliance off the request path.
+
+    Jobs are recorded as ``pending`` immediately, executed with at most
+    ``max_workers`` concurrent judge calls, and finish as ``done`` or ``failed``.
+    At most ``max_queued`` jobs (running or waiting) are held; further
+    submissions are rejected. :meth:`shutdown` drains in-flight jobs and
+    marks any it has to cancel as ``failed`` so none stay ``pending``.
+    """
+
+    def __init__(
+        self,
+        compliance_checker: ComplianceChecker,
+        max_workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+    ) -> None:
+        self.compliance_checker = compliance_checker
+        self.max_workers = max_workers or int(os.getenv("COMPLIANCE_MAX_WORKERS", "4"))
+        self.max_queued = max_queued or int(os.getenv("COMPLIANCE_MAX_QUEUED", "1000"))
+        self.poll_interval = float(os.getenv("COMPLIANCE_POLL_INTERVAL", "0.5"))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._closing = False
+        self._reserved = 0  # submissions between the capacity check and task creation
+
+    @property
+    def accepting(self) -> bool:
+        return not self._closing and len(self._tasks) + self._reserved < self.max_queued
+
+    async def submit(
+        self,
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        llm_provider: str = None,
+        model_name: str = None,
+        bypass_cache: bool = False,
+    ) -> str:
+        """Record a pending analysis and schedule it.
+
+        Raises :class:`ComplianceQueueFull` when the queue is full or shutting down.
+        """
+        if self._closing:
+            raise ComplianceQueueFull("Compliance analysis is shutting down")
+        if len(self._tasks) + self._reserved >= self.max_queued:
+            raise ComplianceQueueFull(f"Compliance analysis queue is full ({self.max_queued} jobs)")
+        compliance_id = str(uuid.uuid4())
+        self._reserved += 1
+        try:
+            # SQLite writes can wait on the batch writer's lock; keep them off the loop.
+            await asyncio.to_thread(self.compliance_checker.analysis_store.create_pending, compliance_id)
+        finally:
+            self._reserved -= 1
+        self._events[compliance_id] = asyncio.Event()
+        task = asyncio.create_task(
+            self._run(compliance_id, guidelines, user_message, assistant_response, llm_provider, model_name, bypass_cache)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return compliance_id
+
+    async def wait_for(self, compliance_id: str, timeout: float) -> Optional[ComplianceAnalysis]:
+        """Long-poll until the analysis leaves ``pending`` or the timeout elapses."""
+        event = self._events.get(compliance_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            return await asyncio.to_thread(self.compliance_checker.get_analysis, compliance_id)
+
+        # Submitted by another worker (or already finished): poll the shared store.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            analysis = await asyncio.to_thread(self.compliance_checker.get_analysis, compliance_id)
+            if analysis is None or analysis.status in TERMINAL_STATUSES or loop.time() >= deadline:
+                return analysis
+            await asyncio.sleep(min(self.poll_interval, max(deadline - loop.time(), 0)))
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stop accepting jobs, wait up to ``timeout`` seconds, then cancel the rest."""
+        self._closing = True
+        if timeout is None:
+            timeout = float(os.getenv("COMPLIANCE_SHUTDOWN_TIMEOUT", "10"))
+        tasks = list(self._tasks)
+        if not tasks:
+            return
+        _, remaining = await asyncio.wait(tasks, timeout=timeout)
+        if remaining:
+            print(f"[ComplianceJobRunner] 종료 시 미완료 분석 {len(remaining)}건 취소")
+            for task in remaining:
+                task.cancel()
+            # Cancelled jobs mark themselves failed in _run.
+            await asyncio.gather(*remaining, return_exceptions=True)
+
+    async def _run(
+        self,
+        compliance_id: str,
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        llm_provider: Optional[str],
+        model_name: Optional[str],
+        bypass_cache: bool,
+    ) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        try:
+            async with self._semaphore:
+                await self.compliance_checker.aanalyze_compliance(
+                    system_prompt_guidelines=guidelines,
+                    user_message=user_message,
+                    assistant_response=assistant_response,
+                    llm_provider=llm_provider,
+                    model_name=model_name,
+                    bypass_cache=bypass_cache,
+                    compliance_id=compliance_id,
+                )
+        except asyncio.CancelledError:
+            await asyncio.to_thread(
+                self.compliance_checker.analysis_store.mark_failed, compliance_id, "cancelled during shutdown"
+            )
+            raise
+        except Exception as e:
+            print(f"Background compliance error: {e}")
+            await asyncio.to_thread(self.compliance_checker.analysis_store.mark_failed, compliance_id, str(e))
+        finally:
+            event = self._events.pop(compliance_id, None)
+            if event is not None:
+                event.set()
@@ -0,0 +1,249 @@
+"""Document ingestion pipeline: sentence-aware chunking, content-hash IDs, batched embedding."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+# Sentence ends: Latin/CJK terminal punctuation followed by whitespace, or a blank line.
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?。！？])\s+|\n\s*\n")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [part.strip() for part in _SENTENCE_END_RE.split(text) if part and part.strip()]
+
+
+def _split_long(sentence: str, max_chars: int) -> Iterator[str]:
+    """Break an over-long sentence on word boundaries (hard cut only for a single huge word)."""
+    current = ""
+    for word in sentence.split():
+        while len(word) > max_chars:
+            if current:
+                yield current
+                current = ""
+            yield word[:max_chars]
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            yield current
+            current = word
+        else:
+            current = candidate
+    if current:
+        yield current
+
+
+def iter_chunks(sentences: Iterable[str], max_chars: int = 800, overlap: int = 100) -> Iterator[str]:
+    """Pack whole sentences into chunks of at most ``max_chars``.
+
+    The trailing sentences of each chunk, up to ``overlap`` characters, are
+    repeated at the start of the next one so context spans chunk borders.
+    """
+    window: List[str] = []
+    size = 0
+    fresh = False  # whether ``window`` holds anything not yet emitted
+    for sentence in sentences:
+        for piece in (_split_long(sentence, max_chars) if len(sentence) > max_chars else (sentence,)):
+            if window and size + 1 + len(piece) > max_chars:
+                if fresh:
+                    yield " ".join(window)
+                carried: List[str] = []
+                carried_size = 0
+                for previous in reversed(window):
+                    if carried_size + len(previous) + 1 > overlap:
+                        break
+                    carried.insert(0, previous)
+                    carried_size += len(previous) + 1
+                # Keep the carried overlap only if the new piece still fits beside it.
+                while carried and carried_size + len(piece) > max_chars:
+                    carried_size -= len(carried.pop(0)) + 1
+                window, size, fresh = carried, max(carried_size - 1, 0), False
+            window.append(piece)
+            size += len(piece) + (1 if len(window) > 1 else 0)
+            fresh = True
+    if window and fresh:
+        yield " ".join(window)
+
+
+def stream_sentences(lines: Iterable[str], markdown: bool = False, max_buffer: int = 65536) -> Iterator[str]:
+    """Sentences from a line stream, holding at most one paragraph (or ``max_buffer`` chars) in memory."""
+    buffer: List[str] = []
+    buffered = 0
+    for line in lines:
+        if markdown and line.lstrip().startswith("#"):
+            # Headings always start a new chunk context.
+            if buffer:
+                yield from split_sentences("".join(buffer))
+                buffer, buffered = [], 0
+            heading = line.strip().lstrip("#").strip()
+            if heading:
+                yield heading
+            continue
+        if not line.strip():
+            if buffer:
+                yield from split_sentences("".join(buffer))
+                buffer, buffered = [], 0
+            continue
+        buffer.append(line)
+        buffered += len(line)
+        if buffered > max_buffer:
+            sentences = split_sentences("".join(buffer))
+            # The last sentence may continue on the next line; keep it buffered,
+            # unless it is most of the buffer (no usable split point, e.g. lists or
+            # logs). Then flush it too and let iter_chunks cut it on word
+            # boundaries, so the buffer never grows past max_buffer.
+            tail = sentences.pop() if sentences else ""
+            if len(tail) > max_buffer // 2:
+                sentences.append(tail)
+                tail = ""
+            yield from sentences
+            buffer = [tail + " "] if tail else []
+            buffered = len(buffer[0]) if buffer else 0
+    if buffer:
+        yield from split_sentences("".join(buffer))
+
+
+def stream_file_chunks(
+    lines: Iterable[str],
+    file_format: str,
+    max_chars: int,
+    overlap: int,
+) -> Iterator[str]:
+    """Chunks for a text, markdown or JSONL line stream.
+
+    JSONL records are chunked independently (no overlap across records); their
+    text is read from the ``content`` or ``text`` field, or ``chosen`` for
+    HH-RLHF style rows.
+    """
+    if file_format != "jsonl":
+        yield from iter_chunks(stream_sentences(lines, markdown=file_format == "markdown"), max_chars, overlap)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict):
+            text = record.get("content") or record.get("text") or record.get("chosen") or ""
+        else:
+            text = record if isinstance(record, str) else ""
+        if text:
+            yield from iter_chunks(split_sentences(text), max_chars, overlap)
+
+
+def chunk_id(source: str, text: str) -> str:
+    normalized = _WHITESPACE_RE.sub(" ", text).strip()
+    return hashlib.sha256(f"{source}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class DocumentIngestor:
+    """Adds a document to a Chroma collection, embedding only chunks it has not seen.
+
+    Chunk IDs hash the document ``source`` together with the chunk text, so a
+    re-upload skips unchanged chunks, refreshes metadata on changed ones
+    without re-embedding, and (when ``source`` is given) removes chunks that
+    are no longer part of the document.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        embed: EmbedFn,
+        batch_size: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        overlap: Optional[int] = None,
+    ) -> None:
+        self.collection = collection
+        self.embed = embed
+        self.batch_size = batch_size or int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+        self.max_chars = max_chars or int(os.getenv("INGEST_CHUNK_SIZE", "800"))
+        self.overlap = overlap if overlap is not None else int(os.getenv("INGEST_CHUNK_OVERLAP", "100"))
+
+    def ingest(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        return self.ingest_chunks(iter_chunks(split_sentences(content), self.max_chars, self.overlap), metadata)
+
+    def ingest_lines(
+        self,
+        lines: Iterable[str],
+        file_format: str = "text",
+        metadata: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Dict[str, int]:
+        chunks = stream_file_chunks(lines, file_format, self.max_chars, self.overlap)
+        return self.ingest_chunks(chunks, metadata, on_progress)
+
+    def ingest_chunks(
+        self,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Dict[str, int]:
+        """Dedupe and store a chunk stream batch by batch; returns per-outcome counts.
+
+        ``chunks`` is pulled lazily, so a streamed source is only read as fast
+        as batches are embedded. ``on_progress`` gets the running counts after
+        each batch.
+        """
+        metadata = dict(metadata or {})
+        source = str(metadata.get("source", ""))
+        report = {"chunks": 0, "added": 0, "skipped": 0, "updated": 0, "removed": 0}
+        seen: Set[str] = set()
+        batch: List[tuple] = []
+        for text in chunks:
+            report["chunks"] += 1
+            cid = chunk_id(source, text)
+            if cid in seen:
+                report["skipped"] += 1
+                continue
+            seen.add(cid)
+            # Chroma rejects empty metadata; the hash also makes stored chunks self-describing.
+            batch.append((cid, text, {**metadata, "chunk_hash": cid}))
+            if len(batch) >= self.batch_size:
+                self._store_batch(batch, report)
+                batch = []
+                if on_progress:
+                    on_progress(dict(report))
+        if batch:
+            self._store_batch(batch, report)
+        if source:
+            report["removed"] = self._remove_stale(source, seen)
+        return report
+
+    def _store_batch(self, batch: List[tuple], report: Dict[str, int]) -> None:
+        ids = [cid for cid, _, _ in batch]
+        existing = self.collection.get(ids=ids, include=["metadatas"])
+        known = dict(zip(existing["ids"], existing["metadatas"] or [None] * len(existing["ids"])))
+
+        new = [item for item in batch if item[0] not in known]
+        changed = [item for item in batch if item[0] in known and known[item[0]] != item[2]]
+        report["skipped"] += len(batch) - len(new) - len(changed)
+
+        if new:
+            embeddings = self.embed([text for _, text, _ in new])
+            self.collection.add(
+                ids=[cid for cid, _, _ in new],
+                documents=[text for _, text, _ in new],
+                metadatas=[meta for _, _, meta in new],
+                embeddings=[list(vector) for vector in embeddings],
+            )
+            report["added"] += len(new)
+        if changed:
+            self.collection.update(
+                ids=[cid for cid, _, _ in changed],
+                metadatas=[meta for _, _, meta in changed],
+            )
+            report["updated"] += len(changed)
+
+    def _remove_stale(self, source: str, keep: Set[str]) -> int:
+        stored = self.collection.get(where={"source": source}, include=[])
+        stale = [cid for cid in stored["ids"] if cid not in keep]
+        if stale:
+            self.collection.delete(ids=stale)
+        return len(stale)
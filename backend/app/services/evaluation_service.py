@@ -1,39 +1,37 @@
 """Evaluation service for prompt compliance scoring."""
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
 import uuid
-from dataclasses import dataclass
-from datetime import datetime
 from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
 
-from app.db import db
+from app.db import BatchWriter, db, decode_cursor, encode_cursor, store_prompt_blob, utc_timestamp
 from app.models.schemas import (
+    ComplianceAnalysis,
+    EvaluationPage,
     EvaluationRequest,
     EvaluationResult,
     EvaluationScores,
+    EvaluationStatsResponse,
     GuidelineCompliance,
     MatchedReference,
 )
 from app.services.compliance_checker import ComplianceChecker
+from app.services.evaluation_stats import EvaluationStats
+from app.services.preference_embeddings import EmbedFn, PreferenceEmbeddings
 from app.services.prompt_improver import PromptImproverService
+from app.services.reference_dataset import ReferenceDataset, ReferenceView
+from app.services.reference_index import NGramIndex
 
 
-@dataclass
-class _ReferenceRecord:
-    reference_id: Optional[int]
-    chosen: str
-    rejected: str
-
-    @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> "_ReferenceRecord":
-        return cls(
-            reference_id=data.get("id"),
-            chosen=data.get("chosen", ""),
-            rejected=data.get("rejected", ""),
-        )
+def _first_human_turn(transcript: str) -> str:
+    """Text of the first "Human:" turn in an HH-RLHF transcript."""
+    return transcript.split("Human:", 1)[-1].split("Assistant:", 1)[0]
 
 
 class EvaluationService:
@@ -42,12 +40,27 @@ class EvaluationService:
         compliance_checker: ComplianceChecker,
         dataset_path: Path | str = Path("./data/hh_rlhf_samples.jsonl"),
         prompt_improver: Optional[PromptImproverService] = None,
+        embedding_function: Optional[EmbedFn] = None,
     ) -> None:
         self.compliance_checker = compliance_checker
         self.dataset_path = Path(dataset_path)
         self.prompt_improver = prompt_improver
-        self._dataset_cache: List[_ReferenceRecord] = []
-        self._dataset_mtime: Optional[float] = None
+        self.stats = EvaluationStats()
+        self._dataset = ReferenceDataset(self.dataset_path)
+        self._dataset_lock = threading.Lock()
+        # Single evaluations are queued and committed in batches off the request path.
+        self._writer: BatchWriter[Tuple[EvaluationResult, EvaluationRequest]] = BatchWriter(
+            self.persist_evaluations,
+            name="evaluation-writer",
+            serialize=lambda item: {"result": item[0].model_dump(), "request": item[1].model_dump()},
+        )
+        self._reference_index = NGramIndex()
+        self.candidate_count = int(os.getenv("REFERENCE_CANDIDATES", "20"))
+        # "embedding" scores against precomputed, memory-mapped chosen/rejected vectors.
+        self.preference_scoring = os.getenv("PREFERENCE_SCORING", "sequence")
+        self._preference_embeddings: Optional[PreferenceEmbeddings] = None
+        if self.preference_scoring == "embedding" and embedding_function is not None:
+            self._preference_embeddings = PreferenceEmbeddings(self.dataset_path, embedding_function)
         self._ensure_dataset_loaded()
 
     def evaluate(self, request: EvaluationRequest) -> EvaluationResult:
@@ -57,8 +70,7 @@ class EvaluationService:
             reference=reference,
         )
 
-        guideline_results: Optional[List[GuidelineCompliance]] = None
-        guideline_score = 1.0
+        analysis = None
         if request.guidelines:
             analysis = self.compliance_checker.analyze_compliance(
                 system_prompt_guidelines=request.guidelines,
@@ -66,14 +78,114 @@ class EvaluationService:
                 assistant_response=request.model_response,
                 llm_provider=request.llm_provider,
                 model_name=request.model_name,
+                bypass_cache=request.bypass_cache,
             )
+
+        result = self._build_result(request, reference, preference_score, matched_reference, analysis)
+        self._persist_evaluation(result, request)
+        return result
+
+    async def aevaluate(self, request: EvaluationRequest, persist: bool = True) -> EvaluationResult:
+        # Reference matching is CPU-bound; keep it off the event loop.
+        reference = await asyncio.to_thread(self._match_reference, request.user_message)
+        preference_score, matched_reference = await asyncio.to_thread(
+            self._score_preference_alignment,
+            request.model_response,
+            reference,
+        )
+
+        analysis = None
+        if request.guidelines:
+            analysis = await self.compliance_checker.aanalyze_compliance(
+                system_prompt_guidelines=request.guidelines,
+                user_message=request.user_message,
+                assistant_response=request.model_response,
+                llm_provider=request.llm_provider,
+                model_name=request.model_name,
+                bypass_cache=request.bypass_cache,
+            )
+
+        result = self._build_result(request, reference, preference_score, matched_reference, analysis)
+        if persist:
+            self._persist_evaluation(result, request)
+        return result
+
+    async def abatch_evaluate(
+        self,
+        requests: Iterable[EvaluationRequest],
+        concurrency: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, Optional[EvaluationResult], Optional[str]]]:
+        """Evaluate many requests concurrently, yielding (index, result, error) as each completes.
+
+        ``concurrency`` caps in-flight judge calls per LLM provider; completed results
+        are persisted in one transaction per ``chunk_size`` rows. ``requests`` is pulled
+        lazily: a new item is taken only when a slot frees up, so a long (e.g. spooled
+        NDJSON) batch never holds more than the in-flight window in memory.
+        """
+        concurrency = concurrency or int(os.getenv("EVALUATION_BATCH_CONCURRENCY", "4"))
+        chunk_size = chunk_size or int(os.getenv("EVALUATION_BATCH_CHUNK_SIZE", "100"))
+        semaphores: Dict[str, asyncio.Semaphore] = {}
+        source = enumerate(requests)
+        in_flight: Set[asyncio.Task] = set()
+
+        async def run(index: int, request: EvaluationRequest, semaphore: asyncio.Semaphore):
+            async with semaphore:
+                try:
+                    return index, request, await self.aevaluate(request, persist=False), None
+                except Exception as exc:  # pylint: disable=broad-except
+                    return index, request, None, str(exc)
+
+        def fill() -> None:
+            # 프로바이더마다 concurrency개씩 돌 수 있도록, 지금까지 본 프로바이더 수 + 1 만큼의 창을 채운다.
+            while len(in_flight) < concurrency * (len(semaphores) + 1):
+                item = next(source, None)
+                if item is None:
+                    return
+                index, request = item
+                provider = request.llm_provider or os.getenv("LLM_PROVIDER", "ollama")
+                semaphore = semaphores.setdefault(provider, asyncio.Semaphore(concurrency))
+                in_flight.add(asyncio.create_task(run(index, request, semaphore)))
+
+        pending: List[Tuple[EvaluationResult, EvaluationRequest]] = []
+        try:
+            fill()
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                in_flight.difference_update(done)
+                fill()
+                for task in done:
+                    index, request, result, error = task.result()
+                    if result is not None:
+                        pending.append((result, request))
+                        if len(pending) >= chunk_size:
+                            # BEGIN IMMEDIATE may wait on the writer thread's lock; keep it off the loop.
+                            await asyncio.to_thread(self.persist_evaluations, pending)
+                            pending = []
+                    yield index, result, error
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if pending:
+                await asyncio.to_thread(self.persist_evaluations, pending)
+
+    def _build_result(
+        self,
+        request: EvaluationRequest,
+        reference: Optional[ReferenceView],
+        preference_score: float,
+        matched_reference: Optional[MatchedReference],
+        analysis: Optional[ComplianceAnalysis],
+    ) -> EvaluationResult:
+        guideline_results: Optional[List[GuidelineCompliance]] = None
+        guideline_score = 1.0
+        if analysis:
             guideline_results = analysis.guideline_results
-            guideline_score = analysis.overall_score / 100 if analysis else 1.0
+            guideline_score = analysis.overall_score / 100
 
         overall_score = (preference_score + guideline_score) / 2
-        evaluation_id = str(uuid.uuid4())
-        result = EvaluationResult(
-            evaluation_id=evaluation_id,
+        return EvaluationResult(
+            evaluation_id=str(uuid.uuid4()),
             prompt_version=request.prompt_version,
             scores=EvaluationScores(
                 preference_alignment=round(preference_score, 4),
@@ -86,32 +198,42 @@ class EvaluationService:
             notes=self._build_notes(reference is None, request.guidelines),
         )
 
-        self._persist_evaluation(result, request)
-        return result
-
     def recent_evaluations(self, limit: int = 10) -> List[EvaluationResult]:
+        return self.evaluations_page(limit=limit).items
+
+    def evaluations_page(self, limit: int = 10, cursor: Optional[str] = None) -> EvaluationPage:
+        """Newest-first page of evaluations; pass ``next_cursor`` back to continue."""
+        self._writer.flush()
+        where = ""
+        params: Tuple = ()
+        if cursor:
+            where = "WHERE (created_at, id) < (?, ?)"
+            params = decode_cursor(cursor)
+        # One joined query instead of a guideline lookup per evaluation row.
         rows = db.query(
-            "SELECT * FROM evaluations ORDER BY datetime(created_at) DESC LIMIT ?",
-            (limit,),
+            f"""
+            SELECT e.*, g.guideline, g.followed, g.explanation, g.evidence
+            FROM (
+                SELECT * FROM evaluations {where} ORDER BY created_at DESC, id DESC LIMIT ?
+            ) AS e
+            LEFT JOIN evaluation_guidelines AS g ON g.evaluation_id = e.id
+            ORDER BY e.created_at DESC, e.id DESC, g.id
+            """,
+            (*params, limit + 1),
         )
-        results: List[EvaluationResult] = []
+        results: Dict[str, EvaluationResult] = {}
+        last_created_at = ""
+        has_more = False
         for row in rows:
-            guidelines = db.query(
-                "SELECT guideline, followed, explanation, evidence FROM evaluation_guidelines WHERE evaluation_id=?",
-                (row["id"],),
-            )
-            guideline_objs = [
-                GuidelineCompliance(
-                    guideline=g["guideline"],
-                    followed=bool(g["followed"]),
-                    explanation=g["explanation"] or "",
-                    evidence=g["evidence"],
-                )
-                for g in guidelines
-            ] or None
-            metadata = json.loads(row["metadata"]) if row["metadata"] else None
-            results.append(
-                EvaluationResult(
+            result = results.get(row["id"])
+            if result is None:
+                if len(results) == limit:
+                    # The extra (limit + 1)th evaluation only signals another page.
+                    has_more = True
+                    break
+                last_created_at = row["created_at"]
+                metadata = json.loads(row["metadata"]) if row["metadata"] else None
+                result = results[row["id"]] = EvaluationResult(
                     evaluation_id=row["id"],
                     prompt_version=row["prompt_version"],
                     scores=EvaluationScores(
@@ -120,42 +242,66 @@ class EvaluationService:
                         overall=row["overall"],
                     ),
                     matched_reference=None,
-                    guideline_results=guideline_objs,
+                    guideline_results=None,
                     notes=row["notes"],
                     metadata=metadata,
                 )
+            if row["guideline"] is None:
+                continue
+            if result.guideline_results is None:
+                result.guideline_results = []
+            result.guideline_results.append(
+                GuidelineCompliance(
+                    guideline=row["guideline"],
+                    followed=bool(row["followed"]),
+                    explanation=row["explanation"] or "",
+                    evidence=row["evidence"],
+                )
             )
-        return results
+        next_cursor = encode_cursor(last_created_at, next(reversed(results))) if has_more else None
+        return EvaluationPage(items=list(results.values()), next_cursor=next_cursor)
 
     def _ensure_dataset_loaded(self) -> None:
-        if not self.dataset_path.exists():
-            self._dataset_cache = []
-            self._dataset_mtime = None
-            return
-        mtime = self.dataset_path.stat().st_mtime
-        if self._dataset_mtime and self._dataset_mtime == mtime:
-            return
-        self._dataset_cache = []
-        with self.dataset_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line)
-                except json.JSONDecodeError:
-                    continue
-                self._dataset_cache.append(_ReferenceRecord.from_dict(data))
-        self._dataset_mtime = mtime
+        with self._dataset_lock:
+            rebuilt, new_rows = self._dataset.refresh()
+            embeddings = self._preference_embeddings
+            if embeddings is not None:
+                if rebuilt:
+                    # Row numbers changed; the old vectors no longer line up.
+                    embeddings.invalidate()
+                # Only maps the offline-built file (one stat when unchanged); never embeds here.
+                embeddings.load()
+            if not rebuilt and not new_rows:
+                return
+            # Appends extend the live index; a shrunk or rewritten file gets a fresh one.
+            index = NGramIndex() if rebuilt else self._reference_index
+            for row, data in new_rows:
+                index.add(row, _first_human_turn(data.get("chosen", "")))
+            self._reference_index = index
+            if embeddings is not None and embeddings.rows < len(self._dataset):
+                print(
+                    f"[EvaluationService] 선호도 임베딩 {embeddings.rows}/{len(self._dataset)}행, "
+                    "나머지는 sequence 방식으로 채점 (python -m app.services.preference_embeddings 로 갱신)"
+                )
 
-    def _match_reference(self, user_message: str) -> Optional[_ReferenceRecord]:
+    def _match_reference(self, user_message: str) -> Optional[ReferenceView]:
         self._ensure_dataset_loaded()
-        if not self._dataset_cache:
-            return None
+        # Index and rows must come from the same refresh: a concurrent rebuild
+        # swaps both, and mixing them hands out stale row ids.
+        with self._dataset_lock:
+            dataset = self._dataset.snapshot()
+            if not len(dataset):
+                return None
+            # Only the top-k index candidates get exact SequenceMatcher rescoring.
+            candidate_ids = self._reference_index.search(user_message, k=self.candidate_count)
         target = f"Human: {user_message.strip()}"
+        if not candidate_ids:
+            # No shared terms with any record: every similarity is near zero anyway.
+            candidate_ids = range(min(self.candidate_count, len(dataset)))
         best_record = None
         best_score = -1.0
-        for record in self._dataset_cache:
+        for record_id in candidate_ids:
+            record = dataset.view(record_id)
             score = self._similarity(target, record.chosen)
             if score > best_score:
                 best_score = score
@@ -165,12 +311,19 @@ class EvaluationService:
     def _score_preference_alignment(
         self,
         model_response: str,
-        reference: Optional[_ReferenceRecord],
+        reference: Optional[ReferenceView],
     ) -> tuple[float, Optional[MatchedReference]]:
         if not reference:
             return 0.5, None
-        sim_chosen = self._similarity(model_response, reference.chosen)
-        sim_rejected = self._similarity(model_response, reference.rejected)
+        sims = None
+        if self._preference_embeddings is not None:
+            sims = self._preference_embeddings.similarities(model_response, reference.row)
+        if sims is not None:
+            # Map cosine similarity from [-1, 1] to [0, 1] so the ratio below stays well-defined.
+            sim_chosen, sim_rejected = ((sim + 1) / 2 for sim in sims)
+        else:
+            sim_chosen = self._similarity(model_response, reference.chosen)
+            sim_rejected = self._similarity(model_response, reference.rejected)
         total = sim_chosen + sim_rejected
         preference_score = sim_chosen / total if total else 0.5
         matched = MatchedReference(
@@ -194,45 +347,72 @@ class EvaluationService:
         return "; ".join(notes) if notes else None
 
     def _persist_evaluation(self, result: EvaluationResult, request: EvaluationRequest) -> None:
-        db.execute(
-            """
-            INSERT INTO evaluations (
-                id, prompt_version, preference_alignment, guideline_adherence,
-                overall, notes, metadata, system_prompt, user_message, created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+        self._writer.submit((result, request))
+
+    def flush_writes(self) -> None:
+        self._writer.flush()
+
+    def stats_snapshot(self, days: int, prompt_version: Optional[str] = None, top: int = 10) -> EvaluationStatsResponse:
+        """Flush queued writes, then read the rollups so the snapshot includes them."""
+        self.flush_writes()
+        return self.stats.snapshot(days=days, prompt_version=prompt_version, top=top)
+
+    def persist_evaluations(self, items: List[Tuple[EvaluationResult, EvaluationRequest]]) -> None:
+        """Write evaluations and their guideline rows under a single commit."""
+        if not items:
+            return
+        # 같은 평가가 한 묶음에 두 번 들어오면(재시도 등) 마지막 것만 저장해 집계가 두 번 더해지지 않게 한다.
+        items = list({result.evaluation_id: (result, request) for result, request in items}.values())
+        created_at = utc_timestamp()
+        guideline_rows = [
             (
                 result.evaluation_id,
-                result.prompt_version,
-                result.scores.preference_alignment,
-                result.scores.guideline_adherence,
-                result.scores.overall,
-                result.notes,
-                json.dumps(result.metadata) if result.metadata is not None else None,
-                request.system_prompt,
-                request.user_message,
-                datetime.utcnow().isoformat(),
-            ),
-        )
-        if result.guideline_results:
-            params = [
+                item.guideline,
+                1 if item.followed else 0,
+                item.explanation,
+                item.evidence,
+            )
+            for result, _ in items
+            for item in result.guideline_results or []
+        ]
+        with db.transaction() as cur:
+            # Each distinct system prompt is stored once and referenced by hash.
+            prompt_hashes = {
+                text: store_prompt_blob(cur, text) for text in {request.system_prompt for _, request in items}
+            }
+            evaluation_rows = [
                 (
                     result.evaluation_id,
-                    item.guideline,
-                    1 if item.followed else 0,
-                    item.explanation,
-                    item.evidence,
+                    result.prompt_version,
+                    result.scores.preference_alignment,
+                    result.scores.guideline_adherence,
+                    result.scores.overall,
+                    result.notes,
+                    json.dumps(result.metadata) if result.metadata is not None else None,
+                    prompt_hashes[request.system_prompt],
+                    request.user_message,
+                    created_at,
                 )
-                for item in result.guideline_results
+                for result, request in items
             ]
-            db.executemany(
+            cur.executemany(
                 """
-                INSERT INTO evaluation_guidelines (
-                    evaluation_id, guideline, followed, explanation, evidence
-                ) VALUES (?, ?, ?, ?, ?)
+                INSERT INTO evaluations (
+                    id, prompt_version, preference_alignment, guideline_adherence,
+                    overall, notes, metadata, system_prompt_hash, user_message, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                params,
+                evaluation_rows,
             )
+            if guideline_rows:
+                cur.executemany(
+                    """
+                    INSERT INTO evaluation_guidelines (
+                        evaluation_id, guideline, followed, explanation, evidence
+                    ) VALUES (?, ?, ?, ?, ?)
+                    """,
+                    guideline_rows,
+                )
+            self.stats.record(cur, [result for result, _ in items], created_at)
         if self.prompt_improver:
-            recent = self.recent_evaluations(limit=50)
-            self.prompt_improver.record_evaluations(recent)
+            self.prompt_improver.record_evaluations([result for result, _ in items])
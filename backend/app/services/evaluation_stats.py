@@ -0,0 +1,122 @@
+"""Incrementally maintained evaluation rollups (per prompt version × day, per guideline)."""
+from __future__ import annotations
+
+import sqlite3
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.db import db
+from app.models.schemas import (
+    EvaluationResult,
+    EvaluationStatsPoint,
+    EvaluationStatsResponse,
+    GuidelineViolationStat,
+)
+
+
+class EvaluationStats:
+    """Keeps ``evaluation_daily_stats`` and ``guideline_stats`` in step with inserts.
+
+    Reads only touch the rollup tables, so their cost depends on the number of
+    versions, days and distinct guidelines, not on how many evaluations exist.
+    """
+
+    def __init__(self) -> None:
+        self.db = db
+
+    def record(self, cur: sqlite3.Cursor, results: Sequence[EvaluationResult], created_at: str) -> None:
+        """Fold a batch of just-inserted evaluations into the rollups (caller's transaction)."""
+        day = created_at[:10]
+        daily: Dict[str, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+        guidelines: Dict[str, List] = defaultdict(lambda: [0, 0, None])
+        for result in results:
+            bucket = daily[result.prompt_version or ""]
+            bucket[0] += 1
+            bucket[1] += result.scores.preference_alignment
+            bucket[2] += result.scores.guideline_adherence
+            bucket[3] += result.scores.overall
+            for item in result.guideline_results or []:
+                stat = guidelines[item.guideline]
+                stat[0] += 1
+                if not item.followed:
+                    stat[1] += 1
+                    stat[2] = created_at
+
+        cur.executemany(
+            """
+            INSERT INTO evaluation_daily_stats (
+                prompt_version, day, evaluations, preference_sum, guideline_sum, overall_sum
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (prompt_version, day) DO UPDATE SET
+                evaluations = evaluations + excluded.evaluations,
+                preference_sum = preference_sum + excluded.preference_sum,
+                guideline_sum = guideline_sum + excluded.guideline_sum,
+                overall_sum = overall_sum + excluded.overall_sum
+            """,
+            [(version, day, *sums) for version, sums in daily.items()],
+        )
+        if guidelines:
+            cur.executemany(
+                """
+                INSERT INTO guideline_stats (guideline, checks, violations, last_violated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (guideline) DO UPDATE SET
+                    checks = checks + excluded.checks,
+                    violations = violations + excluded.violations,
+                    last_violated_at = COALESCE(
+                        MAX(last_violated_at, excluded.last_violated_at),
+                        excluded.last_violated_at,
+                        last_violated_at
+                    )
+                """,
+                [(guideline, *stat) for guideline, stat in guidelines.items()],
+            )
+
+    def timeseries(self, days: int = 30, prompt_version: Optional[str] = None) -> List[EvaluationStatsPoint]:
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        sql = "SELECT * FROM evaluation_daily_stats WHERE day >= ?"
+        params: Tuple = (since,)
+        if prompt_version is not None:
+            sql += " AND prompt_version = ?"
+            params += (prompt_version,)
+        rows = self.db.query(sql + " ORDER BY day, prompt_version", params)
+        return [
+            EvaluationStatsPoint(
+                prompt_version=row["prompt_version"] or None,
+                day=row["day"],
+                evaluations=row["evaluations"],
+                preference_alignment=round(row["preference_sum"] / row["evaluations"], 4),
+                guideline_adherence=round(row["guideline_sum"] / row["evaluations"], 4),
+                overall=round(row["overall_sum"] / row["evaluations"], 4),
+            )
+            for row in rows
+            if row["evaluations"]
+        ]
+
+    def top_violated(self, limit: int = 10) -> List[GuidelineViolationStat]:
+        rows = self.db.query(
+            "SELECT * FROM guideline_stats WHERE violations > 0 ORDER BY violations DESC LIMIT ?",
+            (limit,),
+        )
+        return [
+            GuidelineViolationStat(
+                guideline=row["guideline"],
+                checks=row["checks"],
+                violations=row["violations"],
+                violation_rate=round(row["violations"] / row["checks"], 4) if row["checks"] else 0.0,
+                last_violated_at=row["last_violated_at"],
+            )
+            for row in rows
+        ]
+
+    def snapshot(
+        self,
+        days: int = 30,
+        prompt_version: Optional[str] = None,
+        top: int = 10,
+    ) -> EvaluationStatsResponse:
+        return EvaluationStatsResponse(
+            timeseries=self.timeseries(days=days, prompt_version=prompt_version),
+            top_violated_guidelines=self.top_violated(limit=top),
+        )
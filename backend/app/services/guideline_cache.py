@@ -0,0 +1,61 @@
+"""Persistent memo of LLM guideline extraction per (prompt content hash, model)."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.db import db, utc_timestamp
+
+
+class GuidelineExtractionCache:
+    """Stores extracted guidelines in SQLite with a small in-memory LRU in front."""
+
+    def __init__(self, memory_size: Optional[int] = None) -> None:
+        self.db = db
+        self.memory_size = memory_size if memory_size is not None else int(os.getenv("GUIDELINE_CACHE_MEMORY_SIZE", "256"))
+        self._memory: "OrderedDict[Tuple[str, str], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def content_hash(system_prompt: str) -> str:
+        normalized = "\n".join(" ".join(line.split()) for line in system_prompt.strip().splitlines())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, prompt_hash: str, model_id: str) -> Optional[List[str]]:
+        key = (prompt_hash, model_id)
+        with self._lock:
+            guidelines = self._memory.get(key)
+            if guidelines is not None:
+                self._memory.move_to_end(key)
+                return list(guidelines)
+
+        rows = self.db.query(
+            "SELECT guidelines FROM guideline_extractions WHERE prompt_hash=? AND model=?",
+            (prompt_hash, model_id),
+        )
+        if not rows:
+            return None
+        guidelines = json.loads(rows[0]["guidelines"])
+        self._remember(key, guidelines)
+        return list(guidelines)
+
+    def put(self, prompt_hash: str, model_id: str, guidelines: List[str]) -> None:
+        self.db.execute(
+            """
+            INSERT OR REPLACE INTO guideline_extractions (prompt_hash, model, guidelines, created_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (prompt_hash, model_id, json.dumps(guidelines, ensure_ascii=False), utc_timestamp()),
+        )
+        self._remember((prompt_hash, model_id), list(guidelines))
+
+    def _remember(self, key: Tuple[str, str], guidelines: List[str]) -> None:
+        with self._lock:
+            self._memory[key] = guidelines
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
@@ -0,0 +1,141 @@
+"""Content-addressed cache for LLM compliance judgments."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.db import db
+from app.models.schemas import GuidelineCompliance
+
+
+class JudgmentCache:
+    """In-memory LRU in front of a SQLite table, keyed by a hash of the judge inputs."""
+
+    def __init__(
+        self,
+        memory_size: Optional[int] = None,
+        max_rows: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        self.db = db
+        self.memory_size = memory_size if memory_size is not None else int(os.getenv("JUDGMENT_CACHE_MEMORY_SIZE", "512"))
+        self.max_rows = max_rows if max_rows is not None else int(os.getenv("JUDGMENT_CACHE_MAX_ROWS", "20000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("JUDGMENT_CACHE_TTL", "604800"))
+        self._memory: "OrderedDict[str, tuple[float, List[GuidelineCompliance]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_prune = 0
+        self._stats = {"hits": 0, "memory_hits": 0, "persistent_hits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(
+        guidelines: List[str],
+        user_message: str,
+        assistant_response: str,
+        model_id: str,
+    ) -> str:
+        payload = {
+            "guidelines": [" ".join(g.split()) for g in guidelines],
+            "user_message": " ".join(user_message.split()),
+            "assistant_response": " ".join(assistant_response.split()),
+            "model": model_id,
+        }
+        encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def peek(self, key: str) -> Optional[List[GuidelineCompliance]]:
+        """Memory-only lookup, safe on the event loop; a miss is not counted (``get`` follows)."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created_at, results = entry
+            if self._expired(created_at, now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["memory_hits"] += 1
+            return [item.model_copy() for item in results]
+
+    def get(self, key: str) -> Optional[List[GuidelineCompliance]]:
+        cached = self.peek(key)
+        if cached is not None:
+            return cached
+
+        now = time.time()
+        rows = self.db.query("SELECT payload, created_at FROM judgment_cache WHERE key=?", (key,))
+        if rows and not self._expired(rows[0]["created_at"], now):
+            results = [GuidelineCompliance(**item) for item in json.loads(rows[0]["payload"])]
+            with self._lock:
+                self._remember(key, rows[0]["created_at"], results)
+                self._stats["hits"] += 1
+                self._stats["persistent_hits"] += 1
+            return [item.model_copy() for item in results]
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, results: List[GuidelineCompliance]) -> None:
+        now = time.time()
+        payload = json.dumps([item.model_dump() for item in results], ensure_ascii=False)
+        self.db.execute(
+            "INSERT OR REPLACE INTO judgment_cache (key, payload, created_at) VALUES (?, ?, ?)",
+            (key, payload, now),
+        )
+        with self._lock:
+            self._remember(key, now, [item.model_copy() for item in results])
+            self._writes_since_prune += 1
+            should_prune = self._writes_since_prune >= 100
+            if should_prune:
+                self._writes_since_prune = 0
+        if should_prune:
+            self.prune()
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def prune(self) -> None:
+        """Drop expired rows and trim the table to max_rows (oldest first)."""
+        if self.ttl_seconds > 0:
+            self.db.execute("DELETE FROM judgment_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        if self.max_rows > 0:
+            self.db.execute(
+                """
+                DELETE FROM judgment_cache WHERE key IN (
+                    SELECT key FROM judgment_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_rows,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        self.db.execute("DELETE FROM judgment_cache")
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["persistent_entries"] = self.db.query("SELECT COUNT(*) AS n FROM judgment_cache")[0]["n"]
+        return stats
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, results: List[GuidelineCompliance]) -> None:
+        self._memory[key] = (created_at, results)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
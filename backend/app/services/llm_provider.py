@@ -1,7 +1,60 @@
 """LLM Provider abstraction layer for easy model switching"""
+import asyncio
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from contextlib import contextmanager
+from typing import AsyncIterator, ContextManager, Iterator, List, Dict, Optional, Tuple
+
+
+def _pool_limits():
+    """HTTP connection pool limits shared by every provider client"""
+    import httpx
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_POOL_MAX_CONNECTIONS", "20")),
+        max_keepalive_connections=int(os.getenv("LLM_POOL_MAX_KEEPALIVE", "10")),
+        keepalive_expiry=float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", "60")),
+    )
+
+
+# Event loop that owns the async clients' connections (set by the app lifespan)
+_main_loop: Optional[asyncio.AbstractEventLoop] = None
+# Close tasks scheduled on the running loop; kept referenced until they finish
+_closing_tasks: set = set()
+
+
+def _async_close_fn(client):
+    return getattr(client, "aclose", None) or getattr(client, "close", None)
+
+
+def _close_async_client(client) -> None:
+    """Close an async SDK client from sync code, whichever thread evicts it
+
+    On the loop thread the close is scheduled as a task; from worker threads
+    (sync and to_thread paths) it is handed to the main loop; with no loop
+    available it runs to completion in a temporary one.
+    """
+    close = _async_close_fn(client)
+    if close is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if loop is not None:
+        task = loop.create_task(close())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+        return
+    main_loop = _main_loop
+    if main_loop is not None and main_loop.is_running() and not main_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(close(), main_loop)
+        return
+    try:
+        asyncio.run(close())
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"[LLMProvider] async client 종료 실패: {e}")
 
 
 class LLMProvider(ABC):
@@ -12,11 +65,40 @@ class LLMProvider(ABC):
         """Send chat messages and get response"""
         pass
 
+    @abstractmethod
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        """Send chat messages and get response without blocking the event loop"""
+        pass
+
+    @abstractmethod
+    def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        """Stream response text chunks as the model generates them"""
+        pass
+
     @abstractmethod
     def get_model_name(self) -> str:
         """Get current model name"""
         pass
 
+    def close(self) -> None:
+        """Release pooled HTTP connections held by the provider"""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+        async_client = getattr(self, "async_client", None)
+        if async_client is not None:
+            _close_async_client(async_client)
+
+    async def aclose(self) -> None:
+        """Release pooled connections, awaiting the async client's close on the current loop"""
+        client = getattr(self, "client", None)
+        if client is not None and hasattr(client, "close"):
+            client.close()
+        async_client = getattr(self, "async_client", None)
+        close = _async_close_fn(async_client) if async_client is not None else None
+        if close is not None:
+            await close()
+
 
 class OllamaProvider(LLMProvider):
     """Ollama LLM provider"""
@@ -24,9 +106,11 @@ class OllamaProvider(LLMProvider):
     def __init__(self, model_name: str = None):
         import ollama
         self.ollama = ollama
+        self.client = ollama.Client(limits=_pool_limits())
+        self.async_client = ollama.AsyncClient(limits=_pool_limits())
         self.model = model_name or os.getenv("OLLAMA_MODEL", "llama3.2")
 
-    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+    def _build_kwargs(self, messages: List[Dict], json_format: bool, temperature: float) -> Dict:
         kwargs = {
             "model": self.model,
             "messages": messages
@@ -35,10 +119,23 @@ class OllamaProvider(LLMProvider):
             kwargs["format"] = "json"
         if temperature is not None:
             kwargs["options"] = {"temperature": temperature}
+        return kwargs
+
+    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = self.client.chat(**self._build_kwargs(messages, json_format, temperature))
+        return response['message']['content']
 
-        response = self.ollama.chat(**kwargs)
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = await self.async_client.chat(**self._build_kwargs(messages, json_format, temperature))
         return response['message']['content']
 
+    async def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        stream = await self.async_client.chat(**self._build_kwargs(messages, False, temperature), stream=True)
+        async for chunk in stream:
+            content = chunk['message']['content']
+            if content:
+                yield content
+
     def get_model_name(self) -> str:
         return f"ollama:{self.model}"
 
@@ -47,11 +144,19 @@ class OpenAIProvider(LLMProvider):
     """OpenAI LLM provider"""
 
     def __init__(self, model_name: str = None):
-        from openai import OpenAI
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        import httpx
+        from openai import DEFAULT_TIMEOUT, AsyncOpenAI, OpenAI
+        self.client = OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.Client(limits=_pool_limits(), timeout=DEFAULT_TIMEOUT, follow_redirects=True)
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=DEFAULT_TIMEOUT, follow_redirects=True)
+        )
         self.model = model_name or os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 
-    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+    def _build_kwargs(self, messages: List[Dict], json_format: bool, temperature: float) -> Dict:
         kwargs = {
             "model": self.model,
             "messages": messages
@@ -60,10 +165,26 @@ class OpenAIProvider(LLMProvider):
             kwargs["response_format"] = {"type": "json_object"}
         if temperature is not None:
             kwargs["temperature"] = temperature
+        return kwargs
 
-        response = self.client.chat.completions.create(**kwargs)
+    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = self.client.chat.completions.create(**self._build_kwargs(messages, json_format, temperature))
+        return response.choices[0].message.content
+
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = await self.async_client.chat.completions.create(
+            **self._build_kwargs(messages, json_format, temperature)
+        )
         return response.choices[0].message.content
 
+    async def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(
+            **self._build_kwargs(messages, False, temperature), stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     def get_model_name(self) -> str:
         return f"openai:{self.model}"
 
@@ -72,14 +193,21 @@ class UpstageProvider(LLMProvider):
     """Upstage Solar LLM provider"""
 
     def __init__(self, model_name: str = None):
-        from openai import OpenAI
+        import httpx
+        from openai import DEFAULT_TIMEOUT, AsyncOpenAI, OpenAI
         self.client = OpenAI(
             api_key=os.getenv("UPSTAGE_API_KEY"),
-            base_url="https://api.upstage.ai/v1"
+            base_url="https://api.upstage.ai/v1",
+            http_client=httpx.Client(limits=_pool_limits(), timeout=DEFAULT_TIMEOUT, follow_redirects=True)
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=os.getenv("UPSTAGE_API_KEY"),
+            base_url="https://api.upstage.ai/v1",
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=DEFAULT_TIMEOUT, follow_redirects=True)
         )
         self.model = model_name or os.getenv("UPSTAGE_MODEL", "solar-pro2")
 
-    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+    def _build_kwargs(self, messages: List[Dict], json_format: bool, temperature: float) -> Dict:
         kwargs = {
             "model": self.model,
             "messages": messages
@@ -88,10 +216,26 @@ class UpstageProvider(LLMProvider):
             kwargs["response_format"] = {"type": "json_object"}
         if temperature is not None:
             kwargs["temperature"] = temperature
+        return kwargs
+
+    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = self.client.chat.completions.create(**self._build_kwargs(messages, json_format, temperature))
+        return response.choices[0].message.content
 
-        response = self.client.chat.completions.create(**kwargs)
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = await self.async_client.chat.completions.create(
+            **self._build_kwargs(messages, json_format, temperature)
+        )
         return response.choices[0].message.content
 
+    async def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        stream = await self.async_client.chat.completions.create(
+            **self._build_kwargs(messages, False, temperature), stream=True
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
     def get_model_name(self) -> str:
         return f"upstage:{self.model}"
 
@@ -101,10 +245,18 @@ class AnthropicProvider(LLMProvider):
 
     def __init__(self, model_name: str = None):
         import anthropic
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        import httpx
+        self.client = anthropic.Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=httpx.Client(limits=_pool_limits(), timeout=anthropic.DEFAULT_TIMEOUT, follow_redirects=True)
+        )
+        self.async_client = anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"),
+            http_client=httpx.AsyncClient(limits=_pool_limits(), timeout=anthropic.DEFAULT_TIMEOUT, follow_redirects=True)
+        )
         self.model = model_name or os.getenv("ANTHROPIC_MODEL", "claude-3-haiku-20240307")
 
-    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+    def _build_kwargs(self, messages: List[Dict], temperature: float) -> Dict:
         # Anthropic uses different message format
         system_message = ""
         chat_messages = []
@@ -124,10 +276,21 @@ class AnthropicProvider(LLMProvider):
             kwargs["system"] = system_message
         if temperature is not None:
             kwargs["temperature"] = temperature
+        return kwargs
+
+    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = self.client.messages.create(**self._build_kwargs(messages, temperature))
+        return response.content[0].text
 
-        response = self.client.messages.create(**kwargs)
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        response = await self.async_client.messages.create(**self._build_kwargs(messages, temperature))
         return response.content[0].text
 
+    async def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        async with self.async_client.messages.stream(**self._build_kwargs(messages, temperature)) as stream:
+            async for text in stream.text_stream:
+                yield text
+
     def get_model_name(self) -> str:
         return f"anthropic:{self.model}"
 
@@ -141,7 +304,7 @@ class GeminiProvider(LLMProvider):
         self.model_name = model_name or os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
         self.model = genai.GenerativeModel(self.model_name)
 
-    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+    def _prepare(self, messages: List[Dict], json_format: bool, temperature: float):
         # Gemini message format conversion
         gemini_messages = []
         system_instruction = ""
@@ -159,27 +322,45 @@ class GeminiProvider(LLMProvider):
         if temperature is not None:
             generation_config["temperature"] = temperature
 
-        # Start chat with history
-        chat = self.model.start_chat(history=gemini_messages[:-1] if len(gemini_messages) > 1 else [])
+        history = gemini_messages[:-1] if len(gemini_messages) > 1 else []
 
         # Add system instruction to the last user message if exists
         last_message = gemini_messages[-1]["parts"][0] if gemini_messages else ""
         if system_instruction:
             last_message = f"{system_instruction}\n\n{last_message}"
 
-        # Generate response
+        # Request JSON output
         if json_format:
             last_message += "\n\nRespond with valid JSON only."
 
-        response = chat.send_message(last_message, generation_config=generation_config if generation_config else None)
+        return history, last_message, generation_config or None
+
+    def chat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        history, last_message, generation_config = self._prepare(messages, json_format, temperature)
+        chat = self.model.start_chat(history=history)
+        response = chat.send_message(last_message, generation_config=generation_config)
+        return response.text
+
+    async def achat(self, messages: List[Dict], json_format: bool = False, temperature: float = None) -> str:
+        history, last_message, generation_config = self._prepare(messages, json_format, temperature)
+        chat = self.model.start_chat(history=history)
+        response = await chat.send_message_async(last_message, generation_config=generation_config)
         return response.text
 
+    async def astream(self, messages: List[Dict], temperature: float = None) -> AsyncIterator[str]:
+        history, last_message, generation_config = self._prepare(messages, False, temperature)
+        chat = self.model.start_chat(history=history)
+        response = await chat.send_message_async(last_message, generation_config=generation_config, stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
     def get_model_name(self) -> str:
         return f"gemini:{self.model_name}"
 
 
-def get_llm_provider(provider_type: str = None, model_name: str = None) -> LLMProvider:
-    """Factory function to get LLM provider based on config"""
+def _create_llm_provider(provider_type: str = None, model_name: str = None) -> LLMProvider:
+    """Factory function to build a new LLM provider based on config"""
 
     provider_type = provider_type or os.getenv("LLM_PROVIDER", "ollama")
 
@@ -197,13 +378,149 @@ def get_llm_provider(provider_type: str = None, model_name: str = None) -> LLMPr
         raise ValueError(f"Unknown LLM provider: {provider_type}")
 
 
+class ProviderRegistry:
+    """Keeps one warm provider (and its keep-alive HTTP pool) per (provider_type, model_name)
+
+    Callers that use a provider across a request should hold it through
+    lease(): idle eviction skips keys with an active lease, so a client is
+    never closed under an in-flight call or stream.
+    """
+
+    def __init__(self, idle_ttl: float = None):
+        self.idle_ttl = idle_ttl if idle_ttl is not None else float(os.getenv("LLM_PROVIDER_IDLE_TTL", "900"))
+        self._providers: Dict[Tuple[str, Optional[str]], LLMProvider] = {}
+        self._last_used: Dict[Tuple[str, Optional[str]], float] = {}
+        self._leases: Dict[Tuple[str, Optional[str]], int] = {}
+        self._pinned: set = set()
+        self._lock = threading.Lock()
+
+    def get(self, provider_type: str = None, model_name: str = None, pinned: bool = False) -> LLMProvider:
+        """Return the cached provider for the key, creating it on first use"""
+        return self._checkout(self._key(provider_type, model_name), pinned=pinned, leased=False)
+
+    @contextmanager
+    def lease(self, provider_type: str = None, model_name: str = None) -> Iterator[LLMProvider]:
+        """Like get(), but keeps the provider from being evicted until the block exits"""
+        key = self._key(provider_type, model_name)
+        provider = self._checkout(key, pinned=False, leased=True)
+        try:
+            yield provider
+        finally:
+            with self._lock:
+                remaining = self._leases.get(key, 0) - 1
+                if remaining > 0:
+                    self._leases[key] = remaining
+                else:
+                    self._leases.pop(key, None)
+                if self._providers.get(key) is provider:
+                    # 사용이 끝난 시점부터 idle 시간을 잰다
+                    self._last_used[key] = time.monotonic()
+
+    def evict_idle(self) -> int:
+        """Close providers unused for longer than idle_ttl; returns how many were evicted"""
+        with self._lock:
+            evicted = self._collect_idle(time.monotonic())
+        for stale in evicted:
+            stale.close()
+        return len(evicted)
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Register the loop that owns async clients so evictions on worker threads can close them there"""
+        global _main_loop
+        _main_loop = loop
+
+    def close_all(self) -> None:
+        for provider in self._take_all():
+            provider.close()
+
+    async def aclose_all(self) -> None:
+        """close_all for the event loop: waits until every async client is actually closed"""
+        for provider in self._take_all():
+            try:
+                await provider.aclose()
+            except Exception as e:  # pylint: disable=broad-except
+                print(f"[ProviderRegistry] {provider.get_model_name()} 종료 실패: {e}")
+        if _closing_tasks:
+            await asyncio.gather(*list(_closing_tasks), return_exceptions=True)
+
+    @staticmethod
+    def _key(provider_type: Optional[str], model_name: Optional[str]) -> Tuple[str, Optional[str]]:
+        return (provider_type or os.getenv("LLM_PROVIDER", "ollama"), model_name or None)
+
+    def _checkout(self, key: Tuple[str, Optional[str]], pinned: bool, leased: bool) -> LLMProvider:
+        with self._lock:
+            evicted = self._collect_idle(time.monotonic())
+            provider = self._providers.get(key)
+            if provider is not None:
+                self._mark_used(key, pinned, leased)
+        for stale in evicted:
+            stale.close()
+        if provider is not None:
+            return provider
+
+        # SDK 클라이언트 생성(import, HTTP 풀 준비)은 잠금 밖에서: 다른 키의 조회를 막지 않는다
+        created = _create_llm_provider(*key)
+        with self._lock:
+            provider = self._providers.get(key)
+            if provider is None:
+                provider = self._providers[key] = created
+                created = None
+            self._mark_used(key, pinned, leased)
+        if created is not None:
+            # 동시에 만든 다른 스레드가 먼저 등록했다
+            created.close()
+        return provider
+
+    def _mark_used(self, key: Tuple[str, Optional[str]], pinned: bool, leased: bool) -> None:
+        self._last_used[key] = time.monotonic()
+        if pinned:
+            self._pinned.add(key)
+        if leased:
+            self._leases[key] = self._leases.get(key, 0) + 1
+
+    def _take_all(self) -> List[LLMProvider]:
+        with self._lock:
+            providers = list(self._providers.values())
+            self._providers.clear()
+            self._last_used.clear()
+            self._leases.clear()
+            self._pinned.clear()
+        return providers
+
+    def _collect_idle(self, now: float) -> List[LLMProvider]:
+        if self.idle_ttl <= 0:
+            return []
+        expired = [
+            key for key, last_used in self._last_used.items()
+            if key not in self._pinned and key not in self._leases and now - last_used > self.idle_ttl
+        ]
+        evicted = []
+        for key in expired:
+            evicted.append(self._providers.pop(key))
+            self._last_used.pop(key, None)
+        return evicted
+
+
+provider_registry = ProviderRegistry()
+
+
+def get_llm_provider(provider_type: str = None, model_name: str = None) -> LLMProvider:
+    """Get a pooled LLM provider for (provider_type, model_name) from the registry"""
+    return provider_registry.get(provider_type, model_name)
+
+
+def lease_llm_provider(provider_type: str = None, model_name: str = None) -> ContextManager[LLMProvider]:
+    """Hold a pooled LLM provider for the duration of a with-block (safe from idle eviction)"""
+    return provider_registry.lease(provider_type, model_name)
+
+
 # Singleton instance
 _llm_provider: Optional[LLMProvider] = None
 
 
 def get_default_llm() -> LLMProvider:
-    """Get default LLM provider (singleton)"""
+    """Get default LLM provider (singleton, never evicted)"""
     global _llm_provider
     if _llm_provider is None:
-        _llm_provider = get_llm_provider()
+        _llm_provider = provider_registry.get(pinned=True)
     return _llm_provider
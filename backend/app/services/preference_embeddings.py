@@ -0,0 +1,142 @@
+"""Precomputed chosen/rejected embeddings for embedding-based preference scoring.
+
+Vectors are stored next to the reference dataset as a float32 ``.npy`` array of
+shape ``(rows, 2, dim)`` (index 0 = chosen, 1 = rejected), L2-normalized and
+memory-mapped read-only so every worker shares the same page cache.
+
+Vectors are only built offline; the service just maps the file (picking up a
+rebuilt one when it changes) and falls back to sequence scoring for rows the
+file does not cover yet. Precompute or extend after appending rows with::
+
+    python -m app.services.preference_embeddings --dataset ./data/hh_rlhf_samples.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.reference_dataset import ReferenceDataset
+
+EmbedFn = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+def embeddings_path_for(dataset_path: Path) -> Path:
+    return dataset_path.with_name(f"{dataset_path.stem}.pref_embeddings.npy")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class PreferenceEmbeddings:
+    def __init__(self, dataset_path: Path, embed: EmbedFn) -> None:
+        self.path = embeddings_path_for(Path(dataset_path))
+        self.embed = embed
+        self._vectors: Optional[np.ndarray] = None
+        # (size, mtime) of the mapped file, and of a file known not to match the dataset.
+        self._loaded_stat: Optional[Tuple[int, float]] = None
+        self._stale_stat: Optional[Tuple[int, float]] = None
+
+    @property
+    def rows(self) -> int:
+        vectors = self._vectors
+        return 0 if vectors is None else vectors.shape[0]
+
+    def load(self) -> int:
+        """Memory-map the vector file if it changed since the last call; returns the rows available.
+
+        Costs one ``stat`` when nothing changed, so it is cheap enough for the request path.
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self._vectors = None
+            self._loaded_stat = None
+            return 0
+        key = (stat.st_size, stat.st_mtime)
+        if key == self._stale_stat:
+            return 0
+        if key != self._loaded_stat:
+            self._vectors = np.load(self.path, mmap_mode="r")
+            self._loaded_stat = key
+        return self.rows
+
+    def invalidate(self) -> None:
+        """Stop using the current file (the dataset was rewritten) until a rebuilt one replaces it."""
+        self._stale_stat = self._loaded_stat
+        self._vectors = None
+        self._loaded_stat = None
+
+    def ensure(
+        self,
+        pairs: Sequence[Tuple[str, str]],
+        batch_size: int = 256,
+        rebuild: bool = False,
+    ) -> None:
+        """Make vectors cover ``pairs``; only rows beyond the existing file are embedded.
+
+        Offline only (see :func:`main`): this embeds with the full model. ``rebuild``
+        re-embeds every row, for when the dataset was rewritten rather than appended to.
+        """
+        existing = self.load()
+        if existing == len(pairs) and not rebuild:
+            return
+        start = existing if existing < len(pairs) and not rebuild else 0
+        dim = len(self.embed(["dimension probe"])[0])
+        # Unique temp name so concurrent builders never write into each other's file.
+        with tempfile.NamedTemporaryFile(dir=self.path.parent, prefix=self.path.name, suffix=".tmp", delete=False) as tmp:
+            tmp_path = Path(tmp.name)
+        try:
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(len(pairs), 2, dim))
+            if start:
+                out[:start] = self._vectors[:start]
+            for offset in range(start, len(pairs), batch_size):
+                batch = pairs[offset:offset + batch_size]
+                texts = [text for pair in batch for text in pair]
+                vectors = _normalize(np.asarray(self.embed(texts), dtype=np.float32))
+                out[offset:offset + len(batch)] = vectors.reshape(len(batch), 2, dim)
+            out.flush()
+            del out
+            tmp_path.replace(self.path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        self._stale_stat = None
+        self.load()
+
+    def similarities(self, response: str, row: int) -> Optional[Tuple[float, float]]:
+        """Cosine similarity of ``response`` to the chosen and rejected texts of ``row``."""
+        vectors = self._vectors
+        if vectors is None or row >= vectors.shape[0]:
+            return None
+        vector = _normalize(np.asarray(self.embed([response]), dtype=np.float32))[0]
+        sims = vectors[row] @ vector
+        return float(sims[0]), float(sims[1])
+
+
+def main() -> None:
+    from chromadb.utils import embedding_functions
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", type=Path, default=Path("./data/hh_rlhf_samples.jsonl"))
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    embed = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
+    # Same line index the service uses, so vector rows line up with ReferenceView.row
+    # (blank, invalid and non-object lines are skipped identically).
+    dataset = ReferenceDataset(args.dataset)
+    dataset.refresh()
+
+    store = PreferenceEmbeddings(args.dataset, embed)
+    store.ensure(dataset.pairs(), batch_size=args.batch_size)
+    print(f"Wrote {store.rows} chosen/rejected embedding pairs to {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 """Prompt improvement service (prototype)."""
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
+from collections import deque
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, TYPE_CHECKING
-
-from openai import OpenAI
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, TYPE_CHECKING
 
 from app.models.schemas import (
     EvaluationRequest,
@@ -17,11 +19,15 @@ from app.models.schemas import (
     PromptVersion,
     ReEvaluationResult,
 )
+from app.services.llm_provider import lease_llm_provider
 from app.services.prompt_store import PromptStore
 
 if TYPE_CHECKING:
     from app.services.evaluation_service import EvaluationService
 
+REWRITE_MODEL = "gpt-4o-mini"
+EVALUATION_WINDOW = 50
+
 
 class PromptImproverService:
     """Generates new prompt versions based on evaluation signals (prototype)."""
@@ -29,16 +35,30 @@ class PromptImproverService:
     def __init__(self, store: PromptStore, evaluation_service: "EvaluationService") -> None:
         self.store = store
         self.evaluation_service = evaluation_service
-        self.last_evaluations: List[EvaluationResult] = []
+        # 최근 평가 창: 저장된 결과가 들어올 때마다 오래된 항목부터 밀려난다.
+        # BatchWriter 스레드가 채우고 이벤트 루프가 읽으므로 잠금으로 보호한다.
+        self.last_evaluations: deque[EvaluationResult] = deque(maxlen=EVALUATION_WINDOW)
+        self._evaluations_lock = threading.Lock()
         self.scenarios = json.loads((Path("./app/config/scenarios.json")).read_text())
 
-    def history(self) -> PromptHistoryResponse:
-        versions = self.store.list_versions()
-        current = self.store.get_current().id if versions else None
-        return PromptHistoryResponse(current_version=current, versions=versions)
+    def history(self, limit: int = 20, cursor: Optional[str] = None) -> PromptHistoryResponse:
+        versions, next_cursor = self.store.list_summaries(limit=limit, cursor=cursor)
+        return PromptHistoryResponse(
+            current_version=self.store.current_version_id(),
+            versions=versions,
+            next_cursor=next_cursor,
+        )
+
+    def record_evaluations(self, evaluations: Iterable[EvaluationResult]) -> None:
+        """Append newly persisted evaluations (oldest first) to the recent window."""
+        evaluations = list(evaluations)
+        with self._evaluations_lock:
+            self.last_evaluations.extend(evaluations)
 
-    def record_evaluations(self, evaluations: List[EvaluationResult]) -> None:
-        self.last_evaluations = evaluations[-50:]
+    def recent_evaluations(self) -> List[EvaluationResult]:
+        """Snapshot of the recent window, oldest first."""
+        with self._evaluations_lock:
+            return list(self.last_evaluations)
 
     def improve(self, request: PromptImproveRequest) -> PromptImproveResponse:
         previous = self.store.get_current()
@@ -58,27 +78,146 @@ class PromptImproverService:
             reevaluation=reevaluation,
         )
 
+    async def aimprove(self, request: PromptImproveRequest) -> PromptImproveResponse:
+        previous, new_version = await self._acreate_version(request)
+
+        reevaluation = None
+        if request.run_reevaluation:
+            reevaluation = await self._arun_reevaluation(
+                new_version,
+                concurrency=request.reevaluation_concurrency,
+                time_budget=request.reevaluation_time_budget,
+            )
+
+        return PromptImproveResponse(
+            new_version=new_version,
+            previous_version=previous,
+            message="새 프롬프트 버전을 생성했습니다",
+            reevaluation=reevaluation,
+        )
+
+    async def astream_improve(self, request: PromptImproveRequest) -> AsyncIterator[Dict[str, Any]]:
+        """Create a new version, then stream re-evaluation events as scenarios finish."""
+        previous, new_version = await self._acreate_version(request)
+        yield {"type": "version", "new_version": new_version, "previous_version": previous}
+        if request.run_reevaluation:
+            async for event in self.astream_reevaluation(
+                new_version,
+                concurrency=request.reevaluation_concurrency,
+                time_budget=request.reevaluation_time_budget,
+            ):
+                yield event
+
+    async def _acreate_version(self, request: PromptImproveRequest) -> tuple[PromptVersion, PromptVersion]:
+        previous = self.store.get_current()
+        rationale = request.rationale or self._derive_rationale()
+        new_content = await self._agenerate_new_prompt(previous.content, rationale)
+        notes = f"Auto-generated on {datetime.utcnow().isoformat()} | reason: {rationale}"
+        new_version = self.store.save_new_version(content=new_content, notes=notes)
+        return previous, new_version
+
     def _run_reevaluation(self, version: PromptVersion) -> ReEvaluationResult:
         scenarios = self.scenarios.get("compliance", [])
         results: List[EvaluationResult] = []
         for scenario in scenarios:
-            evaluation = self.evaluation_service.evaluate(
-                EvaluationRequest(
-                    system_prompt=version.content,
-                    user_message=scenario["user_message"],
-                    model_response=scenario["model_response"],
-                    prompt_version=version.id,
-                    guidelines=scenario["guidelines"],
-                )
-            )
+            evaluation = self.evaluation_service.evaluate(self._scenario_request(version, scenario))
             results.append(evaluation)
         summary = f"총 {len(results)}건 재평가 완료"
         return ReEvaluationResult(evaluations=results, summary=summary)
 
+    async def _arun_reevaluation(
+        self,
+        version: PromptVersion,
+        concurrency: Optional[int] = None,
+        time_budget: Optional[float] = None,
+    ) -> ReEvaluationResult:
+        results: List[EvaluationResult] = []
+        summary = None
+        incomplete: List[str] = []
+        failed: List[str] = []
+        async for event in self.astream_reevaluation(version, concurrency, time_budget):
+            if event["type"] == "evaluation":
+                results.append(event["evaluation"])
+            elif event["type"] == "summary":
+                summary = event["summary"]
+                incomplete = event["incomplete"]
+                failed = event["failed"]
+        return ReEvaluationResult(evaluations=results, summary=summary, incomplete=incomplete, failed=failed)
+
+    async def astream_reevaluation(
+        self,
+        version: PromptVersion,
+        concurrency: Optional[int] = None,
+        time_budget: Optional[float] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Evaluate scenarios concurrently within a time budget.
+
+        Yields ``evaluation``/``error`` events as scenarios complete and a final
+        ``summary`` event listing scenarios that did not finish before the budget ran out.
+        Completed evaluations are persisted together in one transaction.
+        """
+        scenarios = self.scenarios.get("compliance", [])
+        concurrency = concurrency or int(os.getenv("REEVALUATION_CONCURRENCY", "4"))
+        time_budget = time_budget or float(os.getenv("REEVALUATION_TIME_BUDGET", "60"))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(request: EvaluationRequest) -> EvaluationResult:
+            async with semaphore:
+                return await self.evaluation_service.aevaluate(request, persist=False)
+
+        tasks: Dict[asyncio.Task, tuple[str, EvaluationRequest]] = {}
+        for index, scenario in enumerate(scenarios):
+            request = self._scenario_request(version, scenario)
+            tasks[asyncio.create_task(run(request))] = (scenario.get("id", f"scenario_{index}"), request)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + time_budget
+        pending = set(tasks)
+        completed: List[tuple[EvaluationResult, EvaluationRequest]] = []
+        failed: List[str] = []
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    scenario_id, request = tasks[task]
+                    if task.exception() is not None:
+                        failed.append(scenario_id)
+                        yield {"type": "error", "scenario_id": scenario_id, "error": str(task.exception())}
+                        continue
+                    evaluation = task.result()
+                    completed.append((evaluation, request))
+                    yield {"type": "evaluation", "scenario_id": scenario_id, "evaluation": evaluation}
+        finally:
+            for task in pending:
+                task.cancel()
+            # 쓰기 잠금을 기다릴 수 있으므로 이벤트 루프 밖에서 저장
+            await asyncio.to_thread(self.evaluation_service.persist_evaluations, completed)
+
+        incomplete = [tasks[task][0] for task in pending]
+        summary = f"총 {len(scenarios)}건 중 {len(completed)}건 재평가 완료"
+        if incomplete:
+            summary += f", 시간 초과로 {len(incomplete)}건 미완료"
+        if failed:
+            summary += f", {len(failed)}건 실패"
+        yield {"type": "summary", "summary": summary, "incomplete": incomplete, "failed": failed}
+
+    def _scenario_request(self, version: PromptVersion, scenario: dict) -> EvaluationRequest:
+        return EvaluationRequest(
+            system_prompt=version.content,
+            user_message=scenario["user_message"],
+            model_response=scenario["model_response"],
+            prompt_version=version.id,
+            guidelines=scenario["guidelines"],
+        )
+
     def _derive_rationale(self) -> str:
-        if not self.last_evaluations:
+        evaluations = self.recent_evaluations()
+        if not evaluations:
             return "평가 데이터 없음"
-        for evaluation in reversed(self.last_evaluations):
+        for evaluation in reversed(evaluations):
             if evaluation.guideline_results:
                 violated = [g.guideline for g in evaluation.guideline_results if not g.followed]
                 if violated:
@@ -86,18 +225,26 @@ class PromptImproverService:
         return "최근 평가 안정적"
 
     def _generate_new_prompt(self, current_prompt: str, rationale: str) -> str:
-        client = OpenAI()
-        system = "You rewrite system prompts to improve compliance."
-        user = f"현재 프롬프트:\n{current_prompt}\n\n개선 사유: {rationale}\n\n개선된 프롬프트를 제공하세요."
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
-                temperature=0.2,
-            )
-            return response.choices[0].message.content.strip()
+            with lease_llm_provider("openai", REWRITE_MODEL) as llm:
+                return llm.chat(self._rewrite_messages(current_prompt, rationale), temperature=0.2).strip()
         except Exception:
-            additions = "\n\n# Auto-adjustments\n- " + rationale
-            if "# Auto-adjustments" in current_prompt:
-                return current_prompt + f"\n- {rationale}"
-            return current_prompt + additions
+            return self._fallback_prompt(current_prompt, rationale)
+
+    async def _agenerate_new_prompt(self, current_prompt: str, rationale: str) -> str:
+        try:
+            with lease_llm_provider("openai", REWRITE_MODEL) as llm:
+                return (await llm.achat(self._rewrite_messages(current_prompt, rationale), temperature=0.2)).strip()
+        except Exception:
+            return self._fallback_prompt(current_prompt, rationale)
+
+    def _rewrite_messages(self, current_prompt: str, rationale: str) -> List[dict]:
+        system = "You rewrite system prompts to improve compliance."
+        user = f"현재 프롬프트:\n{current_prompt}\n\n개선 사유: {rationale}\n\n개선된 프롬프트를 제공하세요."
+        return [{"role": "system", "content": system}, {"role": "user", "content": user}]
+
+    def _fallback_prompt(self, current_prompt: str, rationale: str) -> str:
+        additions = "\n\n# Auto-adjustments\n- " + rationale
+        if "# Auto-adjustments" in current_prompt:
+            return current_prompt + f"\n- {rationale}"
+        return current_prompt + additions
@@ -2,10 +2,24 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.db import db
-from app.models.schemas import PromptVersion
+from app.db import (
+    db,
+    decode_cursor,
+    decode_prompt_blob,
+    encode_cursor,
+    store_prompt_blob,
+    utc_timestamp,
+)
+from app.models.schemas import PromptVersion, PromptVersionSummary
+
+# Prompt bodies live once in prompt_blobs, keyed by content hash.
+_VERSION_SELECT = """
+    SELECT p.id, p.created_at, p.score, p.notes, b.compression, b.data
+    FROM prompts AS p
+    JOIN prompt_blobs AS b ON b.hash = p.content_hash
+"""
 
 
 class PromptStore:
@@ -13,40 +27,98 @@ class PromptStore:
         self.db = db
 
     def list_versions(self) -> List[PromptVersion]:
-        rows = self.db.query("SELECT id, content, created_at, score, notes FROM prompts ORDER BY created_at")
+        rows = self.db.query(_VERSION_SELECT + " ORDER BY p.created_at")
         return [self._row_to_version(row) for row in rows]
 
-    def get_current(self) -> PromptVersion:
+    def list_summaries(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[PromptVersionSummary], Optional[str]]:
+        """Newest-first page of versions without their content, plus the cursor for the next page."""
+        sql = "SELECT id, created_at, score, notes FROM prompts"
+        params: tuple = ()
+        if cursor:
+            sql += " WHERE (created_at, id) < (?, ?)"
+            params = decode_cursor(cursor)
+        rows = self.db.query(sql + " ORDER BY created_at DESC, id DESC LIMIT ?", (*params, limit + 1))
+        summaries = [
+            PromptVersionSummary(
+                id=row["id"],
+                created_at=row["created_at"],
+                score=row["score"],
+                notes=row["notes"],
+            )
+            for row in rows[:limit]
+        ]
+        next_cursor = None
+        if len(rows) > limit:
+            last = summaries[-1]
+            next_cursor = encode_cursor(last.created_at, last.id)
+        return summaries, next_cursor
+
+    def current_version_id(self) -> Optional[str]:
         row = self.db.query("SELECT value FROM prompt_meta WHERE key='current_version'")
-        current_id = row[0]["value"] if row else None
+        return row[0]["value"] if row else None
+
+    def get_current(self) -> PromptVersion:
+        current_id = self.current_version_id()
         if not current_id:
             raise ValueError("current_version not set")
         return self.get_version(current_id)
 
     def get_version(self, version_id: str) -> PromptVersion:
-        rows = self.db.query(
-            "SELECT id, content, created_at, score, notes FROM prompts WHERE id=?",
-            (version_id,),
-        )
+        rows = self.db.query(_VERSION_SELECT + " WHERE p.id=?", (version_id,))
         if not rows:
             raise ValueError(f"Prompt version {version_id} not found")
         return self._row_to_version(rows[0])
 
     def save_new_version(self, content: str, notes: str | None = None, score: float | None = None) -> PromptVersion:
         version_id = datetime.utcnow().strftime("version_%Y%m%d%H%M%S")
-        created_at = datetime.utcnow().isoformat()
-        self.db.execute(
-            "INSERT INTO prompts (id, content, created_at, score, notes) VALUES (?, ?, ?, ?, ?)",
-            (version_id, content, created_at, score, notes),
-        )
-        self._set_current(version_id)
+        created_at = utc_timestamp()
+        with self.db.transaction() as cur:
+            cur.execute(
+                "INSERT INTO prompts (id, content_hash, created_at, score, notes) VALUES (?, ?, ?, ?, ?)",
+                (version_id, store_prompt_blob(cur, content), created_at, score, notes),
+            )
+            self._set_current(version_id)
         return PromptVersion(id=version_id, content=content, created_at=created_at, score=score, notes=notes)
 
     def update_version(self, version: PromptVersion) -> None:
-        self.db.execute(
-            "UPDATE prompts SET content=?, score=?, notes=? WHERE id=?",
-            (version.content, version.score, version.notes, version.id),
-        )
+        with self.db.transaction() as cur:
+            cur.execute(
+                "UPDATE prompts SET content_hash=?, score=?, notes=? WHERE id=?",
+                (store_prompt_blob(cur, version.content), version.score, version.notes, version.id),
+            )
+
+    def storage_report(self) -> Dict[str, Any]:
+        """Bytes the prompt bodies would take stored inline vs. deduplicated in prompt_blobs."""
+        blobs = self.db.query(
+            "SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS unique_bytes, "
+            "COALESCE(SUM(length(data)), 0) AS stored_bytes FROM prompt_blobs"
+        )[0]
+        references = self.db.query(
+            """
+            SELECT COUNT(*) AS refs, COALESCE(SUM(b.size), 0) AS inline_bytes
+            FROM (
+                SELECT system_prompt_hash AS hash FROM evaluations WHERE system_prompt_hash IS NOT NULL
+                UNION ALL
+                SELECT content_hash FROM prompts
+            ) AS r
+            JOIN prompt_blobs AS b ON b.hash = r.hash
+            """
+        )[0]
+        inline_bytes = references["inline_bytes"]
+        stored_bytes = blobs["stored_bytes"]
+        return {
+            "blobs": blobs["blobs"],
+            "references": references["refs"],
+            "inline_bytes": inline_bytes,
+            "unique_bytes": blobs["unique_bytes"],
+            "stored_bytes": stored_bytes,
+            "saved_bytes": inline_bytes - stored_bytes,
+            "saved_ratio": round(1 - stored_bytes / inline_bytes, 4) if inline_bytes else 0.0,
+        }
 
     def _set_current(self, version_id: str) -> None:
         self.db.execute(
@@ -57,7 +129,7 @@ class PromptStore:
     def _row_to_version(self, row) -> PromptVersion:
         return PromptVersion(
             id=row["id"],
-            content=row["content"],
+            content=decode_prompt_blob(row["compression"], row["data"]),
             created_at=row["created_at"],
             score=row["score"],
             notes=row["notes"],
@@ -1,14 +1,22 @@
-import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict
+import asyncio
+import os
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Callable, ContextManager, Iterable, List, Dict
 import uuid
-from app.services.llm_provider import get_default_llm
+from app.services.document_ingestion import DocumentIngestor
+from app.services.retrieval_cache import RetrievalCache
+from app.services.llm_provider import LLMProvider, get_default_llm, lease_llm_provider
 
 
 class RAGService:
     """RAG (Retrieval-Augmented Generation) 서비스"""
 
     def __init__(self, collection_name: str = "documents"):
+        # chromadb/sentence-transformers는 import 비용이 커서 서비스 생성 시점에 불러옴
+        import chromadb
+        from chromadb.utils import embedding_functions
+
         # ChromaDB 클라이언트 초기화
         self.client = chromadb.PersistentClient(path="./data/chroma")
 
@@ -29,6 +37,13 @@ class RAGService:
                 embedding_function=self.embedding_function
             )
 
+        # 문서 수집 파이프라인 (문장 단위 청크, 해시 ID 중복 제거, 배치 임베딩)
+        self.ingestor = DocumentIngestor(self.collection, self.embedding_function)
+
+        # 쿼리 임베딩 LRU + 검색 결과 캐시 (컬렉션 변경 시 버전 증가로 무효화)
+        self.retrieval_cache = RetrievalCache()
+        self.query_batch_size = int(os.getenv("RAG_QUERY_BATCH_SIZE", "256"))
+
         # 기본 LLM 프로바이더
         self.default_llm = get_default_llm()
 
@@ -39,47 +54,112 @@ class RAGService:
         if metadatas is None:
             metadatas = [{"source": f"doc_{i}"} for i in range(len(documents))]
 
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        try:
+            self.collection.add(
+                documents=documents,
+                metadatas=metadatas,
+                ids=ids
+            )
+        finally:
+            self.retrieval_cache.bump_version()
 
         return ids
 
+    def ingest_document(self, content: str, metadata: Dict = None) -> Dict[str, int]:
+        """문서를 청크로 나눠 새 청크만 임베딩하여 추가 (추가/건너뜀/갱신/삭제 수 반환)"""
+        try:
+            return self.ingestor.ingest(content, metadata)
+        finally:
+            self.retrieval_cache.bump_version()
+
+    def ingest_lines(
+        self,
+        lines: Iterable[str],
+        file_format: str = "text",
+        metadata: Dict = None,
+        on_progress: Callable[[Dict[str, int]], None] = None
+    ) -> Dict[str, int]:
+        """줄 스트림(text/markdown/JSONL)을 배치 단위로 수집"""
+        try:
+            return self.ingestor.ingest_lines(lines, file_format=file_format, metadata=metadata, on_progress=on_progress)
+        finally:
+            # 중간에 실패해도 이미 저장된 배치가 있으므로 항상 무효화
+            self.retrieval_cache.bump_version()
+
     def retrieve_context(self, query: str, n_results: int = 3) -> List[str]:
-        """쿼리와 관련된 컨텍스트 검색"""
+        """쿼리와 관련된 컨텍스트 검색 (임베딩/결과 캐시 사용)"""
+        return self.retrieve_many([query], n_results)[0]
+
+    def retrieve_many(self, queries: List[str], n_results: int = 3) -> List[List[str]]:
+        """여러 쿼리의 컨텍스트를 한 번에 검색 (입력 순서대로 반환)
+
+        캐시에 없는 쿼리만 중복을 제거해 한 번에 임베딩하고, ChromaDB에도
+        RAG_QUERY_BATCH_SIZE개씩 묶어 질의한다.
+        """
+        cache = self.retrieval_cache
+        keys = [cache.normalize(query) for query in queries]
+        found: Dict[str, List[str]] = {}
+        pending: Dict[str, str] = {}  # 정규화된 키 -> 원본 쿼리 (중복 제거)
+        for key, query in zip(keys, queries):
+            if key in found or key in pending:
+                continue
+            cached = cache.get_results(key, n_results)
+            if cached is not None:
+                found[key] = cached
+            else:
+                pending[key] = query
+
+        pending_keys = list(pending)
+        for start in range(0, len(pending_keys), self.query_batch_size):
+            batch = pending_keys[start:start + self.query_batch_size]
+            found.update(self._query_batch(batch, [pending[key] for key in batch], n_results))
+
+        return [list(found[key]) for key in keys]
+
+    def _query_batch(self, keys: List[str], queries: List[str], n_results: int) -> Dict[str, List[str]]:
+        """캐시 미스 쿼리 묶음을 한 번의 임베딩 + 한 번의 질의로 처리"""
+        cache = self.retrieval_cache
+        # 검색 전에 버전을 읽어, 검색 도중 컬렉션이 바뀌면 결과를 캐시하지 않음
+        version = cache.version
+
+        embeddings = [cache.get_embedding(key) for key in keys]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            started = time.perf_counter()
+            computed = self.embedding_function([queries[i] for i in missing])
+            elapsed = (time.perf_counter() - started) / len(missing)
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+                cache.put_embedding(keys[i], embedding, elapsed)
+
+        started = time.perf_counter()
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[list(embedding) for embedding in embeddings],
             n_results=n_results
         )
+        elapsed = (time.perf_counter() - started) / len(keys)
 
-        # 검색된 문서 반환
-        if results['documents']:
-            return results['documents'][0]
-        return []
+        documents = results['documents'] or []
+        found = {}
+        for i, key in enumerate(keys):
+            found[key] = documents[i] if i < len(documents) else []
+            cache.put_results(key, n_results, found[key], version, elapsed)
+        return found
 
-    def generate_response(
+    def _resolve_llm(self, llm_provider_type: str = None, model_name: str = None) -> ContextManager[LLMProvider]:
+        """요청별 LLM 프로바이더 선택 (with 블록 동안은 유휴 정리로 닫히지 않음)"""
+        if llm_provider_type:
+            return lease_llm_provider(llm_provider_type, model_name)
+        return nullcontext(self.default_llm)
+
+    def _build_messages(
         self,
         query: str,
         system_prompt: str,
-        context: List[str] = None,
-        conversation_history: List[Dict] = None,
-        llm_provider_type: str = None,
-        model_name: str = None
-    ) -> str:
-        """LLM을 사용하여 응답 생성"""
-
-        # LLM 프로바이더 선택
-        from app.services.llm_provider import get_llm_provider
-        if llm_provider_type:
-            llm = get_llm_provider(llm_provider_type, model_name)
-        else:
-            llm = self.default_llm
-
-        # 컨텍스트가 없으면 검색
-        if context is None:
-            context = self.retrieve_context(query)
+        context: List[str],
+        conversation_history: List[Dict] = None
+    ) -> List[Dict]:
+        """시스템 프롬프트, 컨텍스트, 대화 히스토리로 메시지 구성"""
 
         # 프롬프트 구성
         context_str = "\n\n".join(context) if context else "No relevant context found."
@@ -103,11 +183,55 @@ class RAGService:
             "content": query
         })
 
-        # LLM으로 응답 생성
-        try:
-            return llm.chat(messages)
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+        return messages
+
+    def generate_response(
+        self,
+        query: str,
+        system_prompt: str,
+        context: List[str] = None,
+        conversation_history: List[Dict] = None,
+        llm_provider_type: str = None,
+        model_name: str = None
+    ) -> str:
+        """LLM을 사용하여 응답 생성"""
+
+        # LLM 프로바이더 선택
+        with self._resolve_llm(llm_provider_type, model_name) as llm:
+            # 컨텍스트가 없으면 검색
+            if context is None:
+                context = self.retrieve_context(query)
+
+            messages = self._build_messages(query, system_prompt, context, conversation_history)
+
+            # LLM으로 응답 생성
+            try:
+                return llm.chat(messages)
+            except Exception as e:
+                return f"Error generating response: {str(e)}"
+
+    async def agenerate_response(
+        self,
+        query: str,
+        system_prompt: str,
+        context: List[str] = None,
+        conversation_history: List[Dict] = None,
+        llm_provider_type: str = None,
+        model_name: str = None
+    ) -> str:
+        """LLM을 사용하여 응답 생성 (비동기)"""
+
+        with self._resolve_llm(llm_provider_type, model_name) as llm:
+            # 임베딩/벡터 검색은 CPU 작업이므로 스레드에서 실행
+            if context is None:
+                context = await asyncio.to_thread(self.retrieve_context, query)
+
+            messages = self._build_messages(query, system_prompt, context, conversation_history)
+
+            try:
+                return await llm.achat(messages)
+            except Exception as e:
+                return f"Error generating response: {str(e)}"
 
     def chat(
         self,
@@ -136,3 +260,54 @@ class RAGService:
             "response": response,
             "context_used": context
         }
+
+    async def achat(
+        self,
+        message: str,
+        system_prompt: str,
+        conversation_history: List[Dict] = None,
+        llm_provider: str = None,
+        model_name: str = None
+    ) -> Dict:
+        """채팅 인터페이스 (비동기)"""
+
+        # 관련 컨텍스트 검색
+        context = await asyncio.to_thread(self.retrieve_context, message)
+
+        # 응답 생성
+        response = await self.agenerate_response(
+            query=message,
+            system_prompt=system_prompt,
+            context=context,
+            conversation_history=conversation_history,
+            llm_provider_type=llm_provider,
+            model_name=model_name
+        )
+
+        return {
+            "response": response,
+            "context_used": context
+        }
+
+    async def astream_chat(
+        self,
+        message: str,
+        system_prompt: str,
+        conversation_history: List[Dict] = None,
+        llm_provider: str = None,
+        model_name: str = None
+    ) -> AsyncIterator[Dict]:
+        """스트리밍 채팅 인터페이스: context 이벤트 후 토큰 단위로 응답 전달"""
+
+        # 관련 컨텍스트 검색 후 먼저 전달
+        context = await asyncio.to_thread(self.retrieve_context, message)
+        yield {"type": "context", "context_used": context}
+
+        with self._resolve_llm(llm_provider, model_name) as llm:
+            messages = self._build_messages(message, system_prompt, context, conversation_history)
+
+            try:
+                async for token in llm.astream(messages):
+                    yield {"type": "token", "content": token}
+            except Exception as e:
+                yield {"type": "token", "content": f"Error generating response: {str(e)}"}
@@ -0,0 +1,197 @@
+"""Memory-mapped HH-RLHF reference dataset with a byte-offset line index.
+
+Only the start offset and length of each valid JSONL line are kept in memory;
+``chosen``/``rejected`` strings are decoded from the mapped file on demand
+through :class:`ReferenceView`. Growth of the file is detected by size, so an
+append only indexes the new tail instead of re-reading the whole dataset.
+"""
+from __future__ import annotations
+
+import json
+import mmap
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ReferenceView:
+    """Lazy view of one dataset row; the JSON line is parsed on first access."""
+
+    __slots__ = ("_dataset", "row", "_data")
+
+    def __init__(self, dataset: "ReferenceDataset | ReferenceSnapshot", row: int) -> None:
+        self._dataset = dataset
+        self.row = row
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = self._dataset.read_row(self.row)
+        return self._data
+
+    @property
+    def reference_id(self) -> Optional[int]:
+        return self._load().get("id")
+
+    @property
+    def chosen(self) -> str:
+        return self._load().get("chosen", "")
+
+    @property
+    def rejected(self) -> str:
+        return self._load().get("rejected", "")
+
+
+class _PairsView(Sequence):
+    """(chosen, rejected) pairs for a row range, decoded only when indexed."""
+
+    def __init__(self, dataset: "ReferenceDataset", start: int, stop: int) -> None:
+        self._dataset = dataset
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, _ = item.indices(len(self))
+            return [self[i] for i in range(start, stop)]
+        view = self._dataset.view(self._start + item)
+        return view.chosen, view.rejected
+
+
+class ReferenceSnapshot:
+    """Rows indexed at one point in time; unaffected by later refreshes or rebuilds."""
+
+    __slots__ = ("_mm", "_offsets", "_lengths", "_count")
+
+    def __init__(self, mm: Optional[mmap.mmap], offsets: array, lengths: array) -> None:
+        self._mm = mm
+        # Appends extend the shared arrays in place, so pin the row count.
+        self._count = len(offsets)
+        self._offsets = offsets
+        self._lengths = lengths
+
+    def __len__(self) -> int:
+        return self._count
+
+    def view(self, row: int) -> ReferenceView:
+        if not 0 <= row < self._count:
+            raise IndexError(row)
+        return ReferenceView(self, row)
+
+    def read_row(self, row: int) -> Dict[str, Any]:
+        offset = self._offsets[row]
+        return json.loads(self._mm[offset:offset + self._lengths[row]])
+
+
+class ReferenceDataset:
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._indexed_size = 0
+        # File size/mtime at the last scan; may exceed _indexed_size when the
+        # last line is unterminated and did not parse.
+        self._seen_size = 0
+        self._mtime: Optional[float] = None
+        self._mm: Optional[mmap.mmap] = None
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def view(self, row: int) -> ReferenceView:
+        return ReferenceView(self, row)
+
+    def pairs(self, start: int = 0) -> _PairsView:
+        return _PairsView(self, start, len(self))
+
+    def snapshot(self) -> ReferenceSnapshot:
+        """Consistent view of the rows indexed so far; take it under the same lock as refresh()."""
+        return ReferenceSnapshot(self._mm, self._offsets, self._lengths)
+
+    def read_row(self, row: int) -> Dict[str, Any]:
+        offset = self._offsets[row]
+        return json.loads(self._mm[offset:offset + self._lengths[row]])
+
+    def reset(self) -> None:
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._indexed_size = 0
+        self._seen_size = 0
+        self._mtime = None
+        self._mm = None
+
+    def refresh(self) -> Tuple[bool, List[Tuple[int, Dict[str, Any]]]]:
+        """Index rows added since the last call.
+
+        Returns ``(rebuilt, new_rows)`` where ``new_rows`` holds ``(row, data)``
+        for each newly indexed line. ``rebuilt`` is True when the file shrank or
+        was rewritten in place, in which case every row is reported as new.
+        """
+        if not self.path.exists():
+            rebuilt = bool(self._offsets)
+            self.reset()
+            return rebuilt, []
+        stat = self.path.stat()
+        # Compare with what was seen, not what was indexed: an unparseable
+        # unterminated tail must not trigger a rescan until the file changes.
+        if stat.st_size == self._seen_size and stat.st_mtime == self._mtime:
+            return False, []
+        rebuilt = stat.st_size < self._seen_size or (
+            stat.st_size == self._seen_size and bool(self._offsets)
+        )
+        if stat.st_size == 0:
+            self.reset()
+            self._mtime = stat.st_mtime
+            return rebuilt, []
+
+        # Appends extend the live arrays in place; a rebuild fills fresh ones and
+        # swaps them in at the end so concurrent readers never see a partial index.
+        offsets = array("Q") if rebuilt else self._offsets
+        lengths = array("I") if rebuilt else self._lengths
+        with self.path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not rebuilt:
+            # The grown mapping covers every existing offset, so publish it before appending.
+            self._mm = mm
+        new_rows: List[Tuple[int, Dict[str, Any]]] = []
+        position = 0 if rebuilt else self._indexed_size
+        end = len(mm)
+        while position < end:
+            newline = mm.find(b"\n", position, end)
+            if newline < 0:
+                # Trailing line without a newline may still be mid-write; only
+                # accept it once it parses as a complete record.
+                line_end, next_position = end, end
+            else:
+                line_end, next_position = newline, newline + 1
+            data = self._parse(mm[position:line_end])
+            if data is not None:
+                new_rows.append((len(offsets), data))
+                # Length first: readers bound rows by len(offsets).
+                lengths.append(line_end - position)
+                offsets.append(position)
+            elif newline < 0:
+                break
+            position = next_position
+        # Views in flight keep the old mapping alive until they finish.
+        self._mm = mm
+        self._offsets = offsets
+        self._lengths = lengths
+        self._indexed_size = position
+        self._seen_size = stat.st_size
+        self._mtime = stat.st_mtime
+        return rebuilt, new_rows
+
+    @staticmethod
+    def _parse(raw: bytes) -> Optional[Dict[str, Any]]:
+        if not raw.strip():
+            return None
+        try:
+            data = json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return None
+        return data if isinstance(data, dict) else None
@@ -0,0 +1,70 @@
+"""Inverted word n-gram index for reference dataset candidate search."""
+from __future__ import annotations
+
+import heapq
+import math
+import re
+from array import array
+from collections import defaultdict
+from typing import Dict, List, Set
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def index_terms(text: str, max_chars: int = 500) -> Set[str]:
+    """Lower-cased word unigrams and bigrams from the first ``max_chars`` characters."""
+    tokens = _TOKEN_RE.findall((text or "")[:max_chars].lower())
+    terms = set(tokens)
+    terms.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return terms
+
+
+class NGramIndex:
+    """Maps word n-grams to the ids of documents that contain them.
+
+    ``search`` ranks documents by the IDF-weighted number of shared terms and
+    returns a small candidate set for exact rescoring by the caller. Terms that
+    occur in more than ``max_df_ratio`` of documents are skipped as stop-terms.
+    """
+
+    def __init__(self, max_chars: int = 500, max_df_ratio: float = 0.2) -> None:
+        self.max_chars = max_chars
+        self.max_df_ratio = max_df_ratio
+        self._postings: Dict[str, array] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, doc_id: int, text: str) -> None:
+        for term in index_terms(text, self.max_chars):
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = array("I")
+            postings.append(doc_id)
+        self._size += 1
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._size = 0
+
+    def search(self, query: str, k: int = 20) -> List[int]:
+        if not self._size:
+            return []
+        found = [
+            (len(postings), postings)
+            for postings in (self._postings.get(term) for term in index_terms(query, self.max_chars))
+            if postings
+        ]
+        if not found:
+            return []
+        found.sort(key=lambda item: item[0])
+        max_df = max(self.max_df_ratio * self._size, 1)
+        selective = [item for item in found if item[0] <= max_df] or found[:1]
+
+        scores: Dict[int, float] = defaultdict(float)
+        for df, postings in selective:
+            weight = math.log(1 + self._size / df)
+            for doc_id in postings:
+                scores[doc_id] += weight
+        return heapq.nlargest(k, scores, key=scores.__getitem__)
@@ -0,0 +1,141 @@
+"""Two-level cache for RAG retrieval: query embeddings and query results."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class RetrievalCache:
+    """LRU of query text -> embedding, plus LRU of (query, n_results) -> documents.
+
+    Result entries are tagged with the collection version they were computed
+    against; ``bump_version()`` (called on every write to the collection)
+    makes all of them stale at once. The version lives in this process, so
+    writes made by another worker are only picked up once ``result_ttl``
+    expires. Embeddings never go stale: they depend on the query text alone.
+
+    Each miss records how long the work took; each hit adds the running
+    average of that stage to ``saved_seconds``.
+    """
+
+    def __init__(
+        self,
+        embedding_size: Optional[int] = None,
+        result_size: Optional[int] = None,
+        result_ttl: Optional[float] = None,
+    ) -> None:
+        self.embedding_size = embedding_size if embedding_size is not None else int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "1024"))
+        self.result_size = result_size if result_size is not None else int(os.getenv("RAG_RESULT_CACHE_SIZE", "512"))
+        self.result_ttl = result_ttl if result_ttl is not None else float(os.getenv("RAG_RESULT_CACHE_TTL", "300"))
+        self._embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, int], Tuple[int, float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self._stats = {
+            "embedding_hits": 0,
+            "embedding_misses": 0,
+            "result_hits": 0,
+            "result_misses": 0,
+            "invalidations": 0,
+        }
+        # stage -> [total seconds spent on misses, number of misses, seconds saved by hits]
+        self._timing = {"embedding": [0.0, 0, 0.0], "query": [0.0, 0, 0.0]}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump_version(self) -> int:
+        """Mark every cached result stale; call after the collection changes."""
+        with self._lock:
+            self._version += 1
+            self._results.clear()
+            self._stats["invalidations"] += 1
+            return self._version
+
+    def get_embedding(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            if embedding is None:
+                self._stats["embedding_misses"] += 1
+                return None
+            self._embeddings.move_to_end(key)
+            self._stats["embedding_hits"] += 1
+            self._credit("embedding")
+            return embedding
+
+    def put_embedding(self, key: str, embedding: Sequence[float], elapsed: float) -> None:
+        with self._lock:
+            self._record_miss("embedding", elapsed)
+            if self.embedding_size <= 0:
+                return
+            self._embeddings[key] = [float(x) for x in embedding]
+            self._embeddings.move_to_end(key)
+            while len(self._embeddings) > self.embedding_size:
+                self._embeddings.popitem(last=False)
+
+    def get_results(self, key: str, n_results: int) -> Optional[List[str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._results.get((key, n_results))
+            if entry is not None:
+                version, created_at, documents = entry
+                if version == self._version and not (self.result_ttl > 0 and now - created_at > self.result_ttl):
+                    self._results.move_to_end((key, n_results))
+                    self._stats["result_hits"] += 1
+                    self._credit("query")
+                    # Embedding was skipped too on a result hit.
+                    self._credit("embedding")
+                    return list(documents)
+                del self._results[(key, n_results)]
+            self._stats["result_misses"] += 1
+            return None
+
+    def put_results(self, key: str, n_results: int, documents: List[str], version: int, elapsed: float) -> None:
+        """Store results computed against collection ``version`` (dropped if it moved on meanwhile)."""
+        with self._lock:
+            self._record_miss("query", elapsed)
+            if self.result_size <= 0 or version != self._version:
+                return
+            self._results[(key, n_results)] = (version, time.time(), list(documents))
+            self._results.move_to_end((key, n_results))
+            while len(self._results) > self.result_size:
+                self._results.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._embeddings.clear()
+            self._results.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = dict(self._stats)
+            stats["collection_version"] = self._version
+            stats["embedding_entries"] = len(self._embeddings)
+            stats["result_entries"] = len(self._results)
+            timing = {stage: list(values) for stage, values in self._timing.items()}
+        for level in ("embedding", "result"):
+            lookups = stats[f"{level}_hits"] + stats[f"{level}_misses"]
+            stats[f"{level}_hit_rate"] = round(stats[f"{level}_hits"] / lookups, 4) if lookups else 0.0
+        for stage, (total, count, saved) in timing.items():
+            stats[f"avg_{stage}_seconds"] = round(total / count, 6) if count else 0.0
+            stats[f"saved_{stage}_seconds"] = round(saved, 4)
+        stats["saved_seconds"] = round(sum(saved for _, _, saved in timing.values()), 4)
+        return stats
+
+    def _record_miss(self, stage: str, elapsed: float) -> None:
+        timing = self._timing[stage]
+        timing[0] += elapsed
+        timing[1] += 1
+
+    def _credit(self, stage: str) -> None:
+        total, count, _ = self._timing[stage]
+        if count:
+            self._timing[stage][2] += total / count
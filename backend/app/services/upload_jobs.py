@@ -0,0 +1,129 @@
+"""Background ingestion of uploaded knowledge-base files with observable progress."""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import os
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Set
+
+from app.services.rag_service import RAGService
+
+FILE_FORMATS = ("text", "markdown", "jsonl")
+
+
+def detect_format(filename: str, declared: Optional[str] = None) -> str:
+    if declared:
+        if declared not in FILE_FORMATS:
+            raise ValueError(f"Unsupported format {declared!r}; expected one of {', '.join(FILE_FORMATS)}")
+        return declared
+    suffix = Path(filename or "").suffix.lower()
+    if suffix in (".md", ".markdown"):
+        return "markdown"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    return "text"
+
+
+class UploadJobRunner:
+    """Ingests spooled upload files on a small pool, tracking progress per job ID.
+
+    The file is read lazily line by line (each read capped at ``max_line_bytes``)
+    and pulled through the chunk/embed pipeline, so memory stays bounded by one
+    embedding batch regardless of file size. Job state lives in this process;
+    the most recent ``history`` jobs are kept for polling.
+    """
+
+    def __init__(self, rag_service: RAGService, max_jobs: Optional[int] = None, history: int = 100) -> None:
+        self.rag_service = rag_service
+        self.max_jobs = max_jobs or int(os.getenv("INGEST_MAX_JOBS", "1"))
+        self.max_line_bytes = int(os.getenv("INGEST_MAX_LINE_BYTES", str(1 << 20)))
+        self.history = history
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def submit(self, source: BinaryIO, filename: str, file_format: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a job for an already spooled file and schedule it; call from the event loop.
+
+        The job takes ownership of ``source`` and closes it when ingestion ends.
+        """
+        job_id = str(uuid.uuid4())
+        bytes_total = source.seek(0, os.SEEK_END)
+        job = {
+            "job_id": job_id,
+            "status": "pending",
+            "filename": filename,
+            "format": file_format,
+            "bytes_total": bytes_total,
+            "bytes_read": 0,
+            "chunks": 0,
+            "added": 0,
+            "skipped": 0,
+            "updated": 0,
+            "removed": 0,
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None,
+        }
+        self._jobs[job_id] = job
+        while len(self._jobs) > self.history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest["status"] in ("pending", "running"):
+                break
+            self._jobs.pop(oldest_id)
+        task = asyncio.create_task(self._run(job, source, metadata))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        snapshot = dict(job)
+        total = snapshot["bytes_total"]
+        snapshot["progress"] = round(snapshot["bytes_read"] / total, 4) if total else 1.0
+        return snapshot
+
+    async def _run(self, job: Dict[str, Any], source: BinaryIO, metadata: Dict[str, Any]) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+        try:
+            async with self._semaphore:
+                job["status"] = "running"
+                report = await asyncio.to_thread(self._ingest, job, source, metadata)
+                job.update(report)
+                job["bytes_read"] = job["bytes_total"]
+                job["status"] = "done"
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"[UploadJobRunner] {job['job_id']} 실패: {exc}")
+            job["status"] = "failed"
+            job["error"] = str(exc)
+        finally:
+            job["finished_at"] = time.time()
+            source.close()
+
+    def _ingest(self, job: Dict[str, Any], source: BinaryIO, metadata: Dict[str, Any]) -> Dict[str, int]:
+        return self.rag_service.ingest_lines(
+            self._read_lines(job, source),
+            file_format=job["format"],
+            metadata=metadata,
+            on_progress=job.update,
+        )
+
+    def _read_lines(self, job: Dict[str, Any], source: BinaryIO) -> Iterator[str]:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        source.seek(0)
+        while True:
+            raw = source.readline(self.max_line_bytes)
+            if not raw:
+                break
+            job["bytes_read"] += len(raw)
+            yield decoder.decode(raw)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
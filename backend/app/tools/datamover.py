@@ -0,0 +1,224 @@
+"""Bulk JSONL import/export for evaluation data.
+
+Import reads legacy ``{"result", "request", "timestamp"}`` lines (the format of
+``data/evaluations.jsonl``) and writes them with chunked ``executemany``. Each
+chunk commits together with a byte-offset checkpoint, so an interrupted run
+picks up where it stopped; ``--single-transaction`` makes the whole file one
+all-or-nothing commit instead. Export streams evaluations with their guideline
+results as NDJSON in the same format, so the two round-trip.
+
+    python -m app.tools.datamover import --input ./data/evaluations.jsonl
+    python -m app.tools.datamover export --output ./data/export.ndjson --since 2024-06-01
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from app.db import (
+    db,
+    decode_prompt_blob,
+    import_legacy_evaluations,
+    rebuild_evaluation_rollups,
+    utc_timestamp,
+)
+
+
+def _checkpoint(source: str) -> Optional[Dict[str, Any]]:
+    rows = db.query("SELECT * FROM import_checkpoints WHERE source=?", (source,))
+    return dict(rows[0]) if rows else None
+
+
+def _save_checkpoint(cur, source: str, byte_offset: int, rows: int, completed: bool = False) -> None:
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO import_checkpoints (source, byte_offset, rows, completed, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (source, byte_offset, rows, 1 if completed else 0, utc_timestamp()),
+    )
+
+
+def import_jsonl(
+    path: Path,
+    chunk_size: int = 5000,
+    restart: bool = False,
+    single_transaction: bool = False,
+) -> Dict[str, Any]:
+    source = str(path.resolve())
+    size = path.stat().st_size
+    checkpoint = None if restart else _checkpoint(source)
+    start = checkpoint["byte_offset"] if checkpoint and checkpoint["byte_offset"] <= size else 0
+    imported = checkpoint["rows"] if start else 0
+    skipped = 0
+    started_at = time.perf_counter()
+
+    # Nested db.transaction() calls join this outer one when --single-transaction is set.
+    with (db.transaction() if single_transaction else nullcontext()):
+        with path.open("rb") as f:
+            f.seek(start)
+            chunk: List[dict] = []
+            while True:
+                line = f.readline()
+                if line.strip():
+                    try:
+                        chunk.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        skipped += 1
+                if chunk and (len(chunk) >= chunk_size or not line):
+                    with db.transaction() as cur:
+                        imported += import_legacy_evaluations(cur, chunk)
+                        _save_checkpoint(cur, source, f.tell(), imported)
+                    chunk = []
+                    print(f"  {imported} rows ({f.tell() / max(size, 1):.0%})", file=sys.stderr)
+                if not line:
+                    break
+            end = f.tell()
+        with db.transaction() as cur:
+            rebuild_evaluation_rollups(cur)
+            _save_checkpoint(cur, source, end, imported, completed=True)
+
+    return {
+        "source": source,
+        "resumed_from": start,
+        "rows": imported,
+        "skipped_lines": skipped,
+        "seconds": round(time.perf_counter() - started_at, 2),
+    }
+
+
+def _iter_evaluations(
+    chunk_size: int,
+    since: Optional[str],
+    prompt_version: Optional[str],
+) -> Iterator[List[Any]]:
+    """Oldest-first chunks of evaluation rows, paged by (created_at, id)."""
+    after: Tuple[str, str] = (since or "", "")
+    while True:
+        sql = "SELECT * FROM evaluations WHERE (created_at, id) > (?, ?)"
+        params: Tuple[Any, ...] = after
+        if prompt_version is not None:
+            sql += " AND prompt_version = ?"
+            params += (prompt_version,)
+        rows = db.query(sql + " ORDER BY created_at, id LIMIT ?", (*params, chunk_size))
+        if not rows:
+            return
+        yield rows
+        after = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+def export_ndjson(
+    out: TextIO,
+    chunk_size: int = 5000,
+    since: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    include_prompts: bool = True,
+) -> int:
+    prompts: Dict[str, str] = {}
+    exported = 0
+    for rows in _iter_evaluations(chunk_size, since, prompt_version):
+        ids = [row["id"] for row in rows]
+        guidelines: Dict[str, List[Dict[str, Any]]] = {}
+        placeholders = ",".join("?" * len(ids))
+        for g in db.query(
+            "SELECT evaluation_id, guideline, followed, explanation, evidence FROM evaluation_guidelines "
+            f"WHERE evaluation_id IN ({placeholders}) ORDER BY id",
+            ids,
+        ):
+            guidelines.setdefault(g["evaluation_id"], []).append(
+                {
+                    "guideline": g["guideline"],
+                    "followed": bool(g["followed"]),
+                    "explanation": g["explanation"] or "",
+                    "evidence": g["evidence"],
+                }
+            )
+        if include_prompts:
+            missing = {row["system_prompt_hash"] for row in rows} - prompts.keys() - {None}
+            if missing:
+                for blob in db.query(
+                    f"SELECT hash, compression, data FROM prompt_blobs WHERE hash IN ({','.join('?' * len(missing))})",
+                    list(missing),
+                ):
+                    prompts[blob["hash"]] = decode_prompt_blob(blob["compression"], blob["data"])
+        for row in rows:
+            record = {
+                "result": {
+                    "evaluation_id": row["id"],
+                    "prompt_version": row["prompt_version"],
+                    "scores": {
+                        "preference_alignment": row["preference_alignment"],
+                        "guideline_adherence": row["guideline_adherence"],
+                        "overall": row["overall"],
+                    },
+                    "guideline_results": guidelines.get(row["id"]),
+                    "notes": row["notes"],
+                    "metadata": json.loads(row["metadata"]) if row["metadata"] else None,
+                },
+                "request": {
+                    "system_prompt": prompts.get(row["system_prompt_hash"]) if include_prompts else None,
+                    "user_message": row["user_message"],
+                },
+                "timestamp": row["created_at"],
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        exported += len(rows)
+        print(f"  {exported} rows exported", file=sys.stderr)
+    return exported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.datamover")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="legacy evaluations JSONL -> SQLite")
+    importer.add_argument("--input", type=Path, default=Path("./data/evaluations.jsonl"))
+    importer.add_argument("--chunk-size", type=int, default=5000)
+    importer.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    importer.add_argument(
+        "--single-transaction",
+        action="store_true",
+        help="commit the whole file at once (no partial progress is kept on failure)",
+    )
+
+    exporter = commands.add_parser("export", help="SQLite evaluations -> NDJSON")
+    exporter.add_argument("--output", default="-", help="file path, or - for stdout")
+    exporter.add_argument("--chunk-size", type=int, default=5000)
+    exporter.add_argument("--since", help="only evaluations created at or after this ISO timestamp")
+    exporter.add_argument("--prompt-version")
+    exporter.add_argument("--without-prompts", action="store_true", help="omit system prompt bodies")
+
+    args = parser.parse_args()
+    if args.command == "import":
+        report = import_jsonl(
+            args.input,
+            chunk_size=args.chunk_size,
+            restart=args.restart,
+            single_transaction=args.single_transaction,
+        )
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        started_at = time.perf_counter()
+        exported = export_ndjson(
+            out,
+            chunk_size=args.chunk_size,
+            since=args.since,
+            prompt_version=args.prompt_version,
+            include_prompts=not args.without_prompts,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Exported {exported} evaluations in {time.perf_counter() - started_at:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
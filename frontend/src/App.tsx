@@ -20,6 +20,7 @@ function App() {
     return saved ? JSON.parse(saved) : [];
   });
   const [isLoading, setIsLoading] = useState(false);
+  const [streamingContent, setStreamingContent] = useState('');
   const [currentAnalysis, setCurrentAnalysis] = useState<ComplianceAnalysis | null>(null);
   const [isAnalyzing, setIsAnalyzing] = useState(false);
 
@@ -64,33 +65,44 @@ function App() {
     setMessages((prev) => [...prev, userMessage]);
     setIsLoading(true);
 
+    let streamed = '';
+    let complianceId = null as string | null;
     try {
-      const response = await chatApi.sendMessage({
-        message,
-        system_prompt: systemPrompt,
-        conversation_history: messages,
-        llm_provider: llmProvider || undefined,
-        model_name: modelName || undefined,
-      });
+      await chatApi.streamMessage(
+        {
+          message,
+          system_prompt: systemPrompt,
+          conversation_history: messages,
+          llm_provider: llmProvider || undefined,
+          model_name: modelName || undefined,
+        },
+        {
+          onToken: (token) => {
+            streamed += token;
+            setStreamingContent(streamed);
+          },
+          onCompliance: (id) => {
+            complianceId = id;
+          },
+        },
+      );
 
       const assistantMessage: ChatMessage = {
         role: 'assistant',
-        content: response.response,
+        content: streamed,
       };
       setMessages((prev) => [...prev, assistantMessage]);
+      setStreamingContent('');
 
       // 준수도 분석 가져오기
-      setIsAnalyzing(true);
-      setTimeout(async () => {
-        try {
-          const analysis = await complianceApi.getAnalysis(response.compliance_id);
-          setCurrentAnalysis(analysis);
-        } catch (error) {
-          console.error('Failed to fetch compliance analysis:', error);
-        } finally {
-          setIsAnalyzing(false);
-        }
-      }, 500);
+      if (complianceId) {
+        setIsAnalyzing(true);
+        complianceApi
+          .waitForAnalysis(complianceId)
+          .then(setCurrentAnalysis)
+          .catch((error) => console.error('Failed to fetch compliance analysis:', error))
+          .finally(() => setIsAnalyzing(false));
+      }
     } catch (error) {
       console.error('Failed to send message:', error);
       const errorMessage: ChatMessage = {
@@ -98,6 +110,7 @@ function App() {
         content: '죄송합니다. 메시지 전송 중 오류가 발생했습니다. 서버가 실행 중인지 확인해주세요.',
       };
       setMessages((prev) => [...prev, errorMessage]);
+      setStreamingContent('');
     } finally {
       setIsLoading(false);
     }
@@ -154,6 +167,7 @@ function App() {
             messages={messages}
             onSendMessage={handleSendMessage}
             isLoading={isLoading}
+            streamingContent={streamingContent}
             onClearHistory={clearHistory}
           />
         </div>
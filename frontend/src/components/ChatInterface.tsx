@@ -5,6 +5,7 @@ interface ChatInterfaceProps {
   messages: ChatMessage[];
   onSendMessage: (message: string) => void;
   isLoading: boolean;
+  streamingContent?: string;
   onClearHistory?: () => void;
 }
 
@@ -12,6 +13,7 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({
   messages,
   onSendMessage,
   isLoading,
+  streamingContent,
   onClearHistory,
 }) => {
   const [input, setInput] = useState('');
@@ -23,7 +25,7 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({
 
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [messages, streamingContent]);
 
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault();
@@ -68,7 +70,13 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({
             </div>
           ))
         )}
-        {isLoading && (
+        {streamingContent && (
+          <div style={{ ...styles.message, ...styles.assistantMessage }}>
+            <div style={styles.messageRole}>AI Assistant</div>
+            <div style={styles.messageContent}>{streamingContent}</div>
+          </div>
+        )}
+        {isLoading && !streamingContent && (
           <div style={styles.loadingMessage}>
             <div style={styles.loadingDots}>Generating response...</div>
           </div>
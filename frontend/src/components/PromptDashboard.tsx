@@ -4,6 +4,7 @@ import {
   PromptHistoryResponse,
   ReEvaluationResult,
   EvaluationResult,
+  EvaluationStatsResponse,
 } from '../types';
 import { PromptHistoryPanel } from './PromptHistoryPanel';
 import { EvaluationList } from './EvaluationList';
@@ -11,18 +12,21 @@ import { EvaluationList } from './EvaluationList';
 export const PromptDashboard: React.FC = () => {
   const [history, setHistory] = useState<PromptHistoryResponse | null>(null);
   const [recentEvaluations, setRecentEvaluations] = useState<EvaluationResult[]>([]);
+  const [stats, setStats] = useState<EvaluationStatsResponse | null>(null);
   const [reevaluation, setReevaluation] = useState<ReEvaluationResult | null>(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   const loadData = async () => {
     try {
-      const [historyData, evaluationData] = await Promise.all([
+      const [historyData, evaluationData, statsData] = await Promise.all([
         promptsApi.getHistory(),
         evaluationApi.getRecent(6),
+        evaluationApi.getStats({ days: 14, top: 5 }),
       ]);
       setHistory(historyData);
-      setRecentEvaluations(evaluationData);
+      setRecentEvaluations(evaluationData.items);
+      setStats(statsData);
     } catch (err) {
       console.error(err);
       setError('데이터를 불러오는 중 문제가 발생했습니다.');
@@ -33,6 +37,17 @@ export const PromptDashboard: React.FC = () => {
     loadData();
   }, []);
 
+  const loadMoreHistory = async () => {
+    if (!history?.next_cursor) return;
+    try {
+      const page = await promptsApi.getHistory(history.next_cursor);
+      setHistory({ ...page, versions: [...history.versions, ...page.versions] });
+    } catch (err) {
+      console.error(err);
+      setError('프롬프트 버전을 더 불러오지 못했습니다.');
+    }
+  };
+
   const handleImprove = async () => {
     setLoading(true);
     setError(null);
@@ -65,9 +80,37 @@ export const PromptDashboard: React.FC = () => {
       {error && <div style={styles.error}>{error}</div>}
 
       <div style={styles.grid}>
-        <PromptHistoryPanel history={history} onRefresh={loadData} />
+        <PromptHistoryPanel history={history} onRefresh={loadData} onLoadMore={loadMoreHistory} />
         <div style={styles.sideColumn}>
           <EvaluationList evaluations={recentEvaluations} title="Recent Evaluations" />
+          {stats && stats.top_violated_guidelines.length > 0 && (
+            <div style={styles.card}>
+              <h3 style={{ marginTop: 0 }}>Most Violated Guidelines</h3>
+              {stats.top_violated_guidelines.map((item) => (
+                <div key={item.guideline} style={styles.statRow}>
+                  <span style={{ flex: 1 }}>{item.guideline}</span>
+                  <span style={{ color: '#842029' }}>
+                    {item.violations}/{item.checks} ({Math.round(item.violation_rate * 100)}%)
+                  </span>
+                </div>
+              ))}
+            </div>
+          )}
+          {stats && stats.timeseries.length > 0 && (
+            <div style={styles.card}>
+              <h3 style={{ marginTop: 0 }}>Daily Overall Score (14d)</h3>
+              {stats.timeseries.map((point) => (
+                <div key={`${point.prompt_version}-${point.day}`} style={styles.statRow}>
+                  <span style={{ flex: 1 }}>
+                    {point.day} · {point.prompt_version || 'unversioned'}
+                  </span>
+                  <span>
+                    {(point.overall * 100).toFixed(1)}% ({point.evaluations})
+                  </span>
+                </div>
+              ))}
+            </div>
+          )}
           {reevaluation && (
             <div style={styles.card}>
               <h3 style={{ marginTop: 0 }}>Re-evaluation Summary</h3>
@@ -127,4 +170,11 @@ const styles: Record<string, React.CSSProperties> = {
     padding: '12px',
     boxShadow: '0 2px 4px rgba(0,0,0,0.08)',
   },
+  statRow: {
+    display: 'flex',
+    gap: '8px',
+    fontSize: '13px',
+    padding: '4px 0',
+    borderBottom: '1px solid #f0f0f0',
+  },
 };
@@ -1,12 +1,35 @@
-import React from 'react';
+import React, { useState } from 'react';
+import { promptsApi } from '../services/api';
 import { PromptHistoryResponse } from '../types';
 
 interface Props {
   history: PromptHistoryResponse | null;
   onRefresh: () => void;
+  onLoadMore: () => void;
 }
 
-export const PromptHistoryPanel: React.FC<Props> = ({ history, onRefresh }) => {
+export const PromptHistoryPanel: React.FC<Props> = ({ history, onRefresh, onLoadMore }) => {
+  // 목록에는 본문이 없으므로 펼칠 때 버전별로 불러와 보관한다.
+  const [contents, setContents] = useState<Record<string, string>>({});
+  const [expanded, setExpanded] = useState<string | null>(null);
+
+  const toggleVersion = async (versionId: string) => {
+    if (expanded === versionId) {
+      setExpanded(null);
+      return;
+    }
+    setExpanded(versionId);
+    if (contents[versionId] === undefined) {
+      try {
+        const version = await promptsApi.getVersion(versionId);
+        setContents((prev) => ({ ...prev, [versionId]: version.content }));
+      } catch (err) {
+        console.error(err);
+        setContents((prev) => ({ ...prev, [versionId]: '본문을 불러오지 못했습니다.' }));
+      }
+    }
+  };
+
   if (!history) {
     return (
       <div style={styles.card}>
@@ -30,8 +53,10 @@ export const PromptHistoryPanel: React.FC<Props> = ({ history, onRefresh }) => {
           const isCurrent = version.id === history.current_version;
           return (
             <div key={version.id} style={{ ...styles.versionItem, borderColor: isCurrent ? '#007bff' : '#eee' }}>
-              <div style={styles.versionHeader}>
-                <span style={{ fontWeight: 600 }}>{version.id}</span>
+              <div style={styles.versionHeader} onClick={() => toggleVersion(version.id)}>
+                <span style={{ fontWeight: 600, cursor: 'pointer' }}>
+                  {expanded === version.id ? '▾' : '▸'} {version.id}
+                </span>
                 {isCurrent && <span style={styles.badge}>CURRENT</span>}
               </div>
               <div style={styles.metaRow}>
@@ -39,10 +64,15 @@ export const PromptHistoryPanel: React.FC<Props> = ({ history, onRefresh }) => {
                 {version.score != null && <span>Score: {version.score.toFixed(2)}</span>}
               </div>
               {version.notes && <p style={styles.notes}>{version.notes}</p>}
-              <pre style={styles.promptPreview}>{version.content}</pre>
+              {expanded === version.id && (
+                <pre style={styles.promptPreview}>{contents[version.id] ?? '불러오는 중…'}</pre>
+              )}
             </div>
           );
         })}
+        {history.next_cursor && (
+          <button style={styles.refreshButton} onClick={onLoadMore}>더 보기</button>
+        )}
       </div>
     </div>
   );
@@ -2,11 +2,15 @@ import axios from 'axios';
 import {
   ChatRequest,
   ChatResponse,
+  ChatStreamHandlers,
   ComplianceAnalysis,
   PromptHistoryResponse,
   PromptImproveRequest,
   PromptImproveResponse,
-  EvaluationResult,
+  EvaluationPage,
+  EvaluationStatsResponse,
+  PromptVersion,
+  UploadJob,
 } from '../types';
 
 const API_BASE_URL = 'http://localhost:8000/api';
@@ -24,6 +28,59 @@ export const chatApi = {
     return response.data;
   },
 
+  // SSE(text/event-stream) 응답을 읽어 이벤트별 핸들러 호출
+  streamMessage: async (request: ChatRequest, handlers: ChatStreamHandlers): Promise<void> => {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify(request),
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Stream request failed: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const dispatch = (frame: string) => {
+      let event = 'message';
+      const dataLines: string[] = [];
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          dataLines.push(line.slice(5).trim());
+        }
+      }
+      const data = dataLines.length ? JSON.parse(dataLines.join('\n')) : {};
+      if (event === 'context') {
+        handlers.onContext?.(data.context_used);
+      } else if (event === 'token') {
+        handlers.onToken(data.content);
+      } else if (event === 'compliance') {
+        handlers.onCompliance?.(data.compliance_id);
+      } else if (event === 'error') {
+        throw new Error(data.detail);
+      }
+    };
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        dispatch(buffer.slice(0, boundary));
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+      }
+    }
+    if (buffer.trim()) {
+      dispatch(buffer);
+    }
+  },
+
   uploadDocument: async (content: string, metadata?: Record<string, string>) => {
     const response = await api.post('/chat/upload-document', {
       content,
@@ -32,6 +89,26 @@ export const chatApi = {
     return response.data;
   },
 
+  uploadFile: async (
+    file: File,
+    options?: { source?: string; format?: UploadJob['format']; metadata?: Record<string, string> }
+  ): Promise<UploadJob> => {
+    const form = new FormData();
+    form.append('file', file);
+    if (options?.source) form.append('source', options.source);
+    if (options?.format) form.append('format', options.format);
+    if (options?.metadata) form.append('metadata', JSON.stringify(options.metadata));
+    const response = await api.post<UploadJob>('/chat/upload-file', form, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  },
+
+  getUploadJob: async (jobId: string): Promise<UploadJob> => {
+    const response = await api.get<UploadJob>(`/chat/upload-jobs/${jobId}`);
+    return response.data;
+  },
+
   extractGuidelines: async (systemPrompt: string, llmProvider?: string, modelName?: string): Promise<string[]> => {
     const response = await api.post<{ guidelines: string[] }>('/chat/extract-guidelines', {
       system_prompt: systemPrompt,
@@ -43,15 +120,32 @@ export const chatApi = {
 };
 
 export const complianceApi = {
-  getAnalysis: async (complianceId: string): Promise<ComplianceAnalysis> => {
-    const response = await api.get<ComplianceAnalysis>(`/compliance/${complianceId}`);
+  // wait > 0이면 분석이 끝날 때까지 최대 wait초 동안 서버에서 대기 (long-poll)
+  getAnalysis: async (complianceId: string, wait = 0): Promise<ComplianceAnalysis> => {
+    const response = await api.get<ComplianceAnalysis>(`/compliance/${complianceId}`, {
+      params: wait > 0 ? { wait } : undefined,
+    });
     return response.data;
   },
+
+  waitForAnalysis: async (complianceId: string, maxAttempts = 4): Promise<ComplianceAnalysis> => {
+    let analysis = await complianceApi.getAnalysis(complianceId, 25);
+    for (let attempt = 1; analysis.status === 'pending' && attempt < maxAttempts; attempt++) {
+      analysis = await complianceApi.getAnalysis(complianceId, 25);
+    }
+    return analysis;
+  },
 };
 
 export const promptsApi = {
-  getHistory: async (): Promise<PromptHistoryResponse> => {
-    const response = await api.get<PromptHistoryResponse>('/prompts/history');
+  getHistory: async (cursor?: string | null, limit = 20): Promise<PromptHistoryResponse> => {
+    const response = await api.get<PromptHistoryResponse>('/prompts/history', {
+      params: { limit, cursor: cursor || undefined },
+    });
+    return response.data;
+  },
+  getVersion: async (versionId: string): Promise<PromptVersion> => {
+    const response = await api.get<PromptVersion>(`/prompts/versions/${encodeURIComponent(versionId)}`);
     return response.data;
   },
   improve: async (payload: PromptImproveRequest): Promise<PromptImproveResponse> => {
@@ -61,10 +155,17 @@ export const promptsApi = {
 };
 
 export const evaluationApi = {
-  getRecent: async (limit = 10): Promise<EvaluationResult[]> => {
-    const response = await api.get<EvaluationResult[]>(`/evaluation/recent`, {
-      params: { limit },
+  getRecent: async (limit = 10, cursor?: string | null): Promise<EvaluationPage> => {
+    const response = await api.get<EvaluationPage>(`/evaluation/recent`, {
+      params: { limit, cursor: cursor || undefined },
     });
     return response.data;
   },
+
+  getStats: async (
+    params: { days?: number; prompt_version?: string; top?: number } = {}
+  ): Promise<EvaluationStatsResponse> => {
+    const response = await api.get<EvaluationStatsResponse>(`/evaluation/stats`, { params });
+    return response.data;
+  },
 };
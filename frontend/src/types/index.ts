@@ -20,6 +20,15 @@ export interface ChatResponse {
   response: string;
   context_used: string[];
   compliance_id: string;
+  compliance_status?: ComplianceStatus;
+}
+
+export type ComplianceStatus = 'pending' | 'done' | 'failed';
+
+export interface ChatStreamHandlers {
+  onContext?: (contextUsed: string[]) => void;
+  onToken: (token: string) => void;
+  onCompliance?: (complianceId: string) => void;
 }
 
 export interface GuidelineCompliance {
@@ -34,6 +43,8 @@ export interface ComplianceAnalysis {
   overall_score: number;
   guideline_results: GuidelineCompliance[];
   summary: string;
+  status?: ComplianceStatus;
+  error?: string | null;
 }
 
 export interface PromptVersion {
@@ -44,9 +55,17 @@ export interface PromptVersion {
   notes?: string | null;
 }
 
+export interface PromptVersionSummary {
+  id: string;
+  created_at: string;
+  score?: number | null;
+  notes?: string | null;
+}
+
 export interface PromptHistoryResponse {
-  current_version: string;
-  versions: PromptVersion[];
+  current_version?: string | null;
+  versions: PromptVersionSummary[];
+  next_cursor?: string | null;
 }
 
 export interface EvaluationScores {
@@ -73,9 +92,38 @@ export interface EvaluationResult {
   metadata?: Record<string, any> | null;
 }
 
+export interface EvaluationPage {
+  items: EvaluationResult[];
+  next_cursor?: string | null;
+}
+
+export interface EvaluationStatsPoint {
+  prompt_version?: string | null;
+  day: string;
+  evaluations: number;
+  preference_alignment: number;
+  guideline_adherence: number;
+  overall: number;
+}
+
+export interface GuidelineViolationStat {
+  guideline: string;
+  checks: number;
+  violations: number;
+  violation_rate: number;
+  last_violated_at?: string | null;
+}
+
+export interface EvaluationStatsResponse {
+  timeseries: EvaluationStatsPoint[];
+  top_violated_guidelines: GuidelineViolationStat[];
+}
+
 export interface ReEvaluationResult {
   evaluations: EvaluationResult[];
   summary?: string;
+  incomplete?: string[];
+  failed?: string[];
 }
 
 export interface PromptImproveRequest {
@@ -83,6 +131,8 @@ export interface PromptImproveRequest {
   evaluation_ids?: string[];
   target_score?: number;
   run_reevaluation?: boolean;
+  reevaluation_concurrency?: number;
+  reevaluation_time_budget?: number;
 }
 
 export interface PromptImproveResponse {
@@ -91,3 +141,21 @@ export interface PromptImproveResponse {
   message: string;
   reevaluation?: ReEvaluationResult | null;
 }
+
+export interface UploadJob {
+  job_id: string;
+  status: 'pending' | 'running' | 'done' | 'failed';
+  filename: string;
+  format: 'text' | 'markdown' | 'jsonl';
+  bytes_total: number;
+  bytes_read: number;
+  chunks: number;
+  added: number;
+  skipped: number;
+  updated: number;
+  removed: number;
+  error?: string | null;
+  submitted_at: number;
+  finished_at?: number | null;
+  progress?: number;
+}
@@ -0,0 +1,129 @@
+"""Benchmark reference matching latency: brute-force SequenceMatcher vs. n-gram index.
+
+Usage:
+    python scripts/benchmark_reference_matching.py --sizes 1000 10000 50000 160000
+    python scripts/benchmark_reference_matching.py --dataset backend/data/hh_rlhf_samples.jsonl
+
+Without --dataset, synthetic HH-RLHF-shaped transcripts are generated. Brute force
+is only timed up to --brute-force-limit rows because it grows as O(N × len²).
+The "hit" columns report how often each method returns the row a query was derived from.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from difflib import SequenceMatcher
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from app.services.reference_index import NGramIndex  # noqa: E402
+
+
+def synthetic_transcripts(count: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocab))]
+
+    def sentence(n: int) -> str:
+        return " ".join(rng.choices(vocab, weights=weights, k=n))
+
+    return [
+        f"\n\nHuman: {sentence(rng.randint(6, 30))}\n\nAssistant: {sentence(rng.randint(20, 120))}"
+        for _ in range(count)
+    ]
+
+
+def load_transcripts(path: Path) -> list[str]:
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line).get("chosen", "") for line in f if line.strip()]
+
+
+def first_human_turn(transcript: str) -> str:
+    return transcript.split("Human:", 1)[-1].split("Assistant:", 1)[0]
+
+
+def similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def brute_force(target: str, transcripts: list[str]) -> int:
+    return max(range(len(transcripts)), key=lambda i: similarity(target, transcripts[i]))
+
+
+def indexed(target: str, query: str, transcripts: list[str], index: NGramIndex, k: int) -> int:
+    candidates = index.search(query, k=k) or range(min(k, len(transcripts)))
+    return max(candidates, key=lambda i: similarity(target, transcripts[i]))
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 160000])
+    parser.add_argument("--dataset", type=Path, help="Optional HH-RLHF JSONL to sample rows from")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per dataset size")
+    parser.add_argument("--candidates", type=int, default=20, help="Top-k candidates rescored exactly")
+    parser.add_argument("--brute-force-limit", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    source = load_transcripts(args.dataset) if args.dataset else None
+
+    print(
+        f"{'rows':>8} {'build s':>8} {'idx p50 ms':>11} {'idx p99 ms':>11} {'idx hit':>8} "
+        f"{'bf p50 ms':>10} {'bf p99 ms':>10} {'bf hit':>7}"
+    )
+    for size in args.sizes:
+        if source is not None:
+            transcripts = source[:size]
+            size = len(transcripts)
+        else:
+            transcripts = synthetic_transcripts(size, args.seed)
+
+        started = time.perf_counter()
+        index = NGramIndex()
+        for doc_id, transcript in enumerate(transcripts):
+            index.add(doc_id, first_human_turn(transcript))
+        build_seconds = time.perf_counter() - started
+
+        # Queries are lightly perturbed first human turns, like a user re-asking a known question.
+        queries = []
+        for _ in range(args.queries):
+            source_id = rng.randrange(size)
+            words = first_human_turn(transcripts[source_id]).split()
+            if len(words) > 3:
+                words.pop(rng.randrange(len(words)))
+            queries.append((source_id, " ".join(words)))
+
+        index_times, brute_times, index_hits, brute_hits = [], [], 0, 0
+        run_brute = size <= args.brute_force_limit
+        for source_id, query in queries:
+            target = f"Human: {query}"
+            started = time.perf_counter()
+            found = indexed(target, query, transcripts, index, args.candidates)
+            index_times.append((time.perf_counter() - started) * 1000)
+            index_hits += found == source_id
+            if run_brute:
+                started = time.perf_counter()
+                expected = brute_force(target, transcripts)
+                brute_times.append((time.perf_counter() - started) * 1000)
+                brute_hits += expected == source_id
+
+        bf_p50 = f"{percentile(brute_times, 50):10.2f}" if run_brute else f"{'-':>10}"
+        bf_p99 = f"{percentile(brute_times, 99):10.2f}" if run_brute else f"{'-':>10}"
+        bf_hit = f"{brute_hits / len(queries):7.1%}" if run_brute else f"{'-':>7}"
+        print(
+            f"{size:>8} {build_seconds:8.2f} {percentile(index_times, 50):11.2f} "
+            f"{percentile(index_times, 99):11.2f} {index_hits / len(queries):8.1%} {bf_p50} {bf_p99} {bf_hit}"
+        )
+
+
+if __name__ == "__main__":
+    main()